@@ -77,6 +77,17 @@ DATABASES = {
 }
 
 
+# Cache
+# Friend graphs, block sets and rendered post cards are invalidated by
+# whichever process handles the write, so every worker must share one cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -114,6 +125,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded media (post attachments, photos, stories)
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FacebookAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'facebook_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,52 @@
+"""
+blocks.py
+Bidirectional block sets, cached per user in the same packed-array form as
+the friend graph, and queryset helpers that drop blocked parties
+
+Like the friend graph, block sets rely on the shared cache for
+invalidation to reach every worker, with a short TTL as the backstop.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from .models import BlockedUser
+from .friend_graph import pack_ids, unpack_ids
+
+
+CACHE_TTL = getattr(settings, 'BLOCK_SET_CACHE_TTL', 60 * 5)
+
+
+def _key(user_id):
+    return f'block_set:{user_id}'
+
+
+def blocked_ids(user_id):
+    """Sorted ids of users this user blocked or was blocked by"""
+    raw = cache.get(_key(user_id))
+    if raw is not None:
+        return unpack_ids(raw)
+
+    pairs = BlockedUser.objects.filter(
+        Q(blocker_id=user_id) | Q(blocked_id=user_id)
+    ).values_list('blocker_id', 'blocked_id')
+    ids = sorted({b if a == user_id else a for a, b in pairs})
+    cache.set(_key(user_id), pack_ids(ids), CACHE_TTL)
+    return ids
+
+
+def exclude_blocked(queryset, viewer, field='id'):
+    """Drop rows whose ``field`` points at someone blocked either way
+
+    Most users block nobody, in which case the queryset is returned as is
+    and no extra predicate reaches the database.
+    """
+    ids = blocked_ids(viewer.id)
+    if not ids:
+        return queryset
+    return queryset.exclude(**{f'{field}__in': ids})
+
+
+def invalidate(*user_ids):
+    """Forget cached block sets after a BlockedUser change"""
+    cache.delete_many([_key(user_id) for user_id in user_ids])
@@ -0,0 +1,122 @@
+"""
+comments.py
+Bounded comment loading for feed cards and post threads
+
+A thread page is a keyset page of top-level comments (oldest first) with
+each comment's reply count and first few replies, in two queries whatever
+the page size: the page itself with a correlated reply count, and one
+window query ranking replies per parent. Further replies are paged by
+cursor from the (parent_comment, created_at, id) index.
+
+Threads are one level deep: a reply to a reply is filed under the
+top-level comment (see reply_parent_id), so direct reply counts and pages
+cover every reply.
+"""
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from .models import Comment
+from .blocks import exclude_blocked
+from .feed import decode_cursor, encode_cursor, newer_than
+
+
+PREVIEW_LIMIT = 3
+
+THREAD_PAGE_SIZE = getattr(settings, 'COMMENT_THREAD_PAGE_SIZE', 20)
+
+REPLY_PREVIEW = getattr(settings, 'COMMENT_REPLY_PREVIEW', 2)
+
+REPLY_PAGE_SIZE = getattr(settings, 'COMMENT_REPLY_PAGE_SIZE', 20)
+
+
+def comment_preview_prefetch(viewer, limit=PREVIEW_LIMIT, to_attr='preview_comments'):
+    """Prefetch only the first ``limit`` comments of each post the viewer may see, with authors
+
+    Django compiles a sliced prefetch into one query that ranks comments
+    with ROW_NUMBER() OVER (PARTITION BY post_id ORDER BY created_at) and
+    keeps rank <= limit, so a feed page never loads a post's full thread.
+    Comments by users blocked either way are skipped, as in comment_thread.
+    """
+    comments = exclude_blocked(Comment.objects.select_related('author'), viewer, 'author_id')
+    return Prefetch(
+        'comments',
+        queryset=comments.order_by('created_at', 'id')[:limit],
+        to_attr=to_attr
+    )
+
+
+# ==================== THREADS ====================
+
+def reply_parent_id(post_id, comment_id):
+    """Top-level comment a reply to ``comment_id`` is filed under, or None
+
+    None means the comment does not exist or belongs to another post.
+    """
+    row = Comment.objects.filter(id=comment_id, post_id=post_id).values_list('id', 'parent_comment_id').first()
+    if row is None:
+        return None
+    return row[1] or row[0]
+
+
+def _reply_count(viewer):
+    """Correlated COUNT(*) of the outer comment's direct replies the viewer may see"""
+    rows = exclude_blocked(
+        Comment.objects.filter(parent_comment=OuterRef('pk')),
+        viewer,
+        'author_id'
+    ).order_by().values('parent_comment').annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def _page(comments, cursor, limit):
+    """Keyset page oldest first: (comments, next_cursor)"""
+    if isinstance(cursor, str):
+        cursor = decode_cursor(cursor)
+    if cursor:
+        comments = comments.filter(newer_than(cursor, 'created_at', 'id'))
+    comments = list(comments.order_by('created_at', 'id')[:limit + 1])
+
+    next_cursor = None
+    if len(comments) > limit:
+        last = comments[limit - 1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return comments[:limit], next_cursor
+
+
+def comment_thread(viewer, post_id, cursor=None, limit=THREAD_PAGE_SIZE, replies=REPLY_PREVIEW):
+    """A page of a post's top-level comments: (comments, next_cursor)
+
+    Each comment carries ``reply_count``, ``preview_replies`` (its first
+    ``replies`` replies) and ``replies_cursor`` for fetching the rest.
+    Comments by users the viewer blocked, or who blocked them, are left out.
+    """
+    reply_queryset = exclude_blocked(
+        Comment.objects.select_related('author'), viewer, 'author_id'
+    ).order_by('created_at', 'id')[:replies]
+
+    comments = exclude_blocked(
+        Comment.objects.filter(post_id=post_id, parent_comment__isnull=True),
+        viewer,
+        'author_id'
+    ).select_related('author').annotate(reply_count=_reply_count(viewer)).prefetch_related(
+        Prefetch('replies', queryset=reply_queryset, to_attr='preview_replies')
+    )
+    comments, next_cursor = _page(comments, cursor, limit)
+
+    for comment in comments:
+        comment.replies_cursor = None
+        if comment.reply_count > len(comment.preview_replies):
+            last = comment.preview_replies[-1] if comment.preview_replies else None
+            comment.replies_cursor = encode_cursor(last.created_at, last.id) if last else ''
+    return comments, next_cursor
+
+
+def reply_page(viewer, comment_id, cursor=None, limit=REPLY_PAGE_SIZE):
+    """A page of replies to one comment, oldest first: (replies, next_cursor)"""
+    replies = exclude_blocked(
+        Comment.objects.filter(parent_comment_id=comment_id),
+        viewer,
+        'author_id'
+    ).select_related('author')
+    return _page(replies, cursor or None, limit)
@@ -0,0 +1,127 @@
+"""
+deletion.py
+Soft-delete-then-purge for posts
+
+Deleting a post only stamps ``deleted_at``: the post drops out of every
+feed and query at once and the request returns immediately. The
+purge_deleted_posts command later removes the post and everything hanging
+off it (reactions, comments and their reactions, media, saves, feed
+entries, polls...) in bounded batches of plain DELETE ... WHERE id IN (...)
+statements, instead of Django's collector loading every related row into
+memory first. Stored files are deleted after their rows.
+"""
+
+from collections import Counter
+from django.db import connections, models, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Post
+
+
+BATCH_SIZE = 1000
+
+
+# ==================== SOFT DELETE ====================
+
+def soft_delete_post(post):
+    """Hide a post everywhere now; its rows are purged later"""
+    with transaction.atomic():
+        post.deleted_at = timezone.now()
+        post.save(update_fields=['deleted_at'])
+        Post.objects.filter(id=post.id).update(version=F('version') + 1)
+        # What the delete signals would do, now rather than at purge time
+        Post.objects.filter(shared_post_id=post.id).update(version=F('version') + 1)
+        if post.shared_post_id:
+            Post.objects.filter(
+                id=post.shared_post_id,
+                share_count__gt=0
+            ).update(share_count=F('share_count') - 1, version=F('version') + 1)
+
+
+# ==================== PURGE ====================
+
+def delete_rows(model, values, using, field=None):
+    """One DELETE FROM <table> WHERE <field> IN (values); returns the row count
+
+    ``field`` defaults to the primary key. This skips Django's collector and
+    the delete signals entirely, so the caller must already have removed any
+    rows that reference these and done whatever the signals would have done.
+    It is the only place the purge code bypasses QuerySet.delete().
+    """
+    values = list(values)
+    if not values:
+        return 0
+    connection = connections[using]
+    column = (model._meta.get_field(field) if field else model._meta.pk).column
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+            f'WHERE {connection.ops.quote_name(column)} IN ({placeholders})',
+            values
+        )
+        return cursor.rowcount
+
+
+def _ids(queryset, batch_size):
+    return list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+
+
+def _purge_through(through, field_name, ids, batch_size, using, counts):
+    """Delete many-to-many link rows pointing at ``ids``"""
+    while True:
+        link_ids = _ids(through.objects.filter(**{f'{field_name}__in': ids}), batch_size)
+        if not link_ids:
+            return
+        counts[through._meta.label] += delete_rows(through, link_ids, using)
+
+
+def _purge_rows(model, ids, batch_size, using, counts):
+    """Delete ``ids`` of ``model`` and, depth first, every row that cascades from them"""
+    for rel in model._meta.related_objects:
+        related = rel.related_model
+        if rel.many_to_many:
+            through = rel.through
+            field = next(f for f in through._meta.fields if f.is_relation and f.related_model is model)
+            _purge_through(through, field.name, ids, batch_size, using, counts)
+            continue
+
+        children = related.objects.filter(**{f'{rel.field.name}__in': ids})
+        if rel.on_delete is models.CASCADE:
+            while child_ids := _ids(children.exclude(pk__in=ids) if related is model else children, batch_size):
+                _purge_rows(related, child_ids, batch_size, using, counts)
+        elif rel.on_delete is models.SET_NULL:
+            while child_ids := _ids(children, batch_size):
+                related.objects.filter(pk__in=child_ids).update(**{rel.field.name: None})
+        elif rel.on_delete is not models.DO_NOTHING:
+            raise ValueError(f'Cannot purge {related._meta.label}.{rel.field.name}: unsupported on_delete')
+
+    for field in model._meta.local_many_to_many:
+        through = field.remote_field.through
+        _purge_through(through, field.m2m_field_name(), ids, batch_size, using, counts)
+
+    file_fields = [f for f in model._meta.concrete_fields if isinstance(f, models.FileField)]
+    files = []
+    if file_fields:
+        for row in model.objects.filter(pk__in=ids).values_list(*[f.attname for f in file_fields]):
+            files += [(field.storage, name) for field, name in zip(file_fields, row) if name]
+
+    counts[model._meta.label] += delete_rows(model, ids, using)
+    # Only once the rows are gone, so a failed batch never leaves rows pointing at missing files
+    for storage, name in files:
+        storage.delete(name)
+
+
+def purge_posts(post_ids, batch_size=BATCH_SIZE):
+    """Permanently delete soft-deleted posts and everything depending on them
+
+    Returns a Counter of rows deleted per model label. Each batch commits on
+    its own; a purge that stops halfway leaves only rows of posts that are
+    already hidden, and the next run picks them up again.
+    """
+    using = router.db_for_write(Post)
+    counts = Counter()
+    post_ids = list(Post.objects.filter(id__in=post_ids, deleted_at__isnull=False).values_list('id', flat=True))
+    for start in range(0, len(post_ids), batch_size):
+        _purge_rows(Post, post_ids[start:start + batch_size], batch_size, using, counts)
+    return counts
@@ -0,0 +1,262 @@
+"""
+feed.py
+Materialized newsfeed: fan-out-on-write into FeedEntry with a pull path
+for authors whose audience is too large to fan out to.
+"""
+
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from .models import FeedEntry, Post, User
+from .blocks import blocked_ids, exclude_blocked
+from .friend_graph import friend_ids
+from .privacy import visible_posts_q
+
+
+# Authors with more friends than this are read at request time instead of
+# being copied into every friend's feed.
+FANOUT_LIMIT = getattr(settings, 'FEED_FANOUT_LIMIT', 5000)
+
+# How many of a new friend's recent posts are copied in on accept.
+BACKFILL_POSTS = getattr(settings, 'FEED_BACKFILL_POSTS', 50)
+
+# How many posts a full rebuild materializes per viewer.
+REBUILD_DEPTH = getattr(settings, 'FEED_REBUILD_DEPTH', 500)
+
+PAGE_SIZE = getattr(settings, 'FEED_PAGE_SIZE', 50)
+
+BATCH_SIZE = 1000
+
+LARGE_AUDIENCE_CACHE_KEY = 'feed:large_audience_ids'
+
+
+# ==================== GRAPH ====================
+
+def large_audience_ids():
+    """Ids of every author served through the pull path"""
+    ids = cache.get(LARGE_AUDIENCE_CACHE_KEY)
+    if ids is None:
+        ids = list(User.objects.filter(large_audience=True).values_list('id', flat=True))
+        cache.set(LARGE_AUDIENCE_CACHE_KEY, ids, 300)
+    return ids
+
+
+def _mark_large_audience(user_id):
+    User.objects.filter(id=user_id).update(large_audience=True)
+    cache.delete(LARGE_AUDIENCE_CACHE_KEY)
+
+
+# ==================== WRITERS ====================
+
+def _entries(post_rows, viewer_ids):
+    """Build FeedEntry rows for (post_id, author_id, created_at) tuples"""
+    return [
+        FeedEntry(viewer_id=viewer_id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, author_id, created_at in post_rows
+        for viewer_id in viewer_ids
+    ]
+
+
+def fan_out_post(post):
+    """Copy a post into its author's feed and, for normal audiences, every friend's feed"""
+    if post.is_archived:
+        return
+
+    viewers = [post.author_id]
+    audience = [] if post.privacy == 'only_me' else friend_ids(post.author_id)
+    if len(audience) > FANOUT_LIMIT:
+        if not post.author.large_audience:
+            _mark_large_audience(post.author_id)
+    else:
+        viewers.extend(audience)
+
+    FeedEntry.objects.bulk_create(
+        _entries([(post.id, post.author_id, post.created_at)], viewers),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove_post(post):
+    """Drop a post from every feed it was written to"""
+    FeedEntry.objects.filter(post=post).delete()
+
+
+def _backfill(viewer_id, author_id):
+    """Copy an author's recent posts into a viewer's feed"""
+    if author_id in large_audience_ids():
+        return
+    rows = Post.objects.filter(
+        author_id=author_id,
+        is_archived=False,
+        deleted_at__isnull=True
+    ).order_by('-created_at').values_list('id', 'author_id', 'created_at')[:BACKFILL_POSTS]
+    FeedEntry.objects.bulk_create(
+        _entries(rows, [viewer_id]),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def connect_feeds(user_a_id, user_b_id):
+    """Two users became friends: each sees the other's recent posts"""
+    _backfill(user_a_id, user_b_id)
+    _backfill(user_b_id, user_a_id)
+
+
+def disconnect_feeds(user_a_id, user_b_id):
+    """Two users stopped being friends: remove each other's posts from their feeds"""
+    FeedEntry.objects.filter(
+        Q(viewer_id=user_a_id, author_id=user_b_id) |
+        Q(viewer_id=user_b_id, author_id=user_a_id)
+    ).delete()
+
+
+def rebuild_feed(user_id):
+    """Rematerialize a single viewer's feed from scratch"""
+    pulled = set(large_audience_ids())
+    authors = [user_id] + [f for f in friend_ids(user_id) if f not in pulled]
+    rows = Post.objects.filter(
+        author_id__in=authors,
+        is_archived=False,
+        deleted_at__isnull=True
+    ).order_by('-created_at').values_list('id', 'author_id', 'created_at')[:REBUILD_DEPTH]
+
+    FeedEntry.objects.filter(viewer_id=user_id).delete()
+    FeedEntry.objects.bulk_create(_entries(rows, [user_id]), batch_size=BATCH_SIZE)
+
+
+# ==================== CURSORS ====================
+
+def encode_cursor(created_at, post_id):
+    """Opaque keyset cursor for the (created_at, id) position of a post"""
+    raw = f'{created_at.isoformat()}|{post_id}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, post_id = urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def older_than(cursor, created_field, id_field):
+    """Keyset predicate selecting rows strictly older than the cursor"""
+    created_at, post_id = cursor
+    return (
+        Q(**{f'{created_field}__lt': created_at}) |
+        Q(**{created_field: created_at, f'{id_field}__lt': post_id})
+    )
+
+
+def newer_than(cursor, created_field, id_field):
+    """Keyset predicate selecting rows strictly newer than the cursor"""
+    created_at, post_id = cursor
+    return (
+        Q(**{f'{created_field}__gt': created_at}) |
+        Q(**{created_field: created_at, f'{id_field}__gt': post_id})
+    )
+
+
+# ==================== READERS ====================
+
+def _pulled_rows(viewer, cursor, limit):
+    """(created_at, post_id) rows from large-audience friends, read at request time"""
+    pulled = set(large_audience_ids()) - {viewer.id}
+    if not pulled:
+        return []
+    pulled.difference_update(blocked_ids(viewer.id))
+    authors = [uid for uid in friend_ids(viewer.id) if uid in pulled]
+    if not authors:
+        return []
+    posts = Post.objects.filter(author_id__in=authors, is_archived=False)
+    posts = posts.filter(visible_posts_q(viewer))
+    if cursor:
+        posts = posts.filter(older_than(cursor, 'created_at', 'id'))
+    return list(posts.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit])
+
+
+def feed_page(viewer, cursor=None, limit=PAGE_SIZE):
+    """One page of a viewer's feed after ``cursor``: (post_ids, next_cursor)
+
+    Every page is the same index range scan on (viewer, created_at, post),
+    so deep pages cost the same as the first one.
+    """
+    if isinstance(cursor, str):
+        cursor = decode_cursor(cursor)
+
+    # Audience lists can change after fan-out, so privacy is rechecked on read
+    entries = FeedEntry.objects.filter(viewer=viewer).filter(visible_posts_q(viewer, 'post__'))
+    entries = exclude_blocked(entries, viewer, 'author_id')
+    if cursor:
+        entries = entries.filter(older_than(cursor, 'created_at', 'post_id'))
+    rows = list(entries.order_by('-created_at', '-post_id').values_list('created_at', 'post_id')[:limit + 1])
+
+    pulled = _pulled_rows(viewer, cursor, limit + 1)
+    if pulled:
+        # Posts written before an author crossed the limit can be in both
+        rows = sorted(set(rows + pulled), reverse=True)[:limit + 1]
+
+    next_cursor = encode_cursor(*rows[limit - 1]) if len(rows) > limit else None
+    return [post_id for _, post_id in rows[:limit]], next_cursor
+
+
+def load_posts(post_ids, queryset=None):
+    """Fetch posts by id, preserving the order of ``post_ids``"""
+    if queryset is None:
+        queryset = Post.objects.all()
+    by_id = {post.id: post for post in queryset.filter(id__in=post_ids)}
+    return [by_id[post_id] for post_id in post_ids if post_id in by_id]
+
+
+def new_since(viewer, cursor=None, limit=PAGE_SIZE):
+    """Posts that reached a viewer's feed after ``cursor``, for cheap polling
+
+    Returns (post_ids, has_more, latest_cursor), newest first. The common
+    "nothing new" answer is a single probe of the (viewer, created_at, post)
+    index that reads no post rows; privacy and blocks are only rechecked for
+    the handful of new ids. Without a cursor nothing is returned except the
+    cursor of the newest entry, which clients use to start polling.
+    """
+    if isinstance(cursor, str):
+        cursor = decode_cursor(cursor)
+
+    entries = FeedEntry.objects.filter(viewer=viewer)
+    if cursor is None:
+        head = entries.order_by('-created_at', '-post_id').values_list('created_at', 'post_id').first()
+        return [], False, encode_cursor(*head) if head else None
+
+    rows = list(
+        entries.filter(newer_than(cursor, 'created_at', 'post_id'))
+        .order_by('-created_at', '-post_id').values_list('created_at', 'post_id')[:limit + 1]
+    )
+    pulled = _pulled_since(viewer, cursor, limit + 1)
+    if pulled:
+        rows = sorted(set(rows + pulled), reverse=True)[:limit + 1]
+    if not rows:
+        return [], False, encode_cursor(*cursor)
+
+    visible = Post.objects.filter(id__in=[post_id for _, post_id in rows]).filter(visible_posts_q(viewer))
+    visible = set(exclude_blocked(visible, viewer, 'author_id').values_list('id', flat=True))
+    post_ids = [post_id for _, post_id in rows[:limit] if post_id in visible]
+    return post_ids, len(rows) > limit, encode_cursor(*rows[0])
+
+
+def _pulled_since(viewer, cursor, limit):
+    """(created_at, post_id) rows from large-audience friends newer than the cursor"""
+    pulled = set(large_audience_ids()) - {viewer.id}
+    if not pulled:
+        return []
+    authors = [uid for uid in friend_ids(viewer.id) if uid in pulled]
+    if not authors:
+        return []
+    posts = Post.objects.filter(author_id__in=authors, is_archived=False, deleted_at__isnull=True)
+    posts = posts.filter(newer_than(cursor, 'created_at', 'id'))
+    return list(posts.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit])
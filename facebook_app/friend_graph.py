@@ -0,0 +1,124 @@
+"""
+friend_graph.py
+Cached adjacency lists of accepted friendships
+
+Each user's friend ids are stored in the cache as the bytes of a sorted
+64-bit int array, so a lookup is one cache hit and membership is a binary
+search. Friendship signals invalidate both ends of a changed edge; that
+only reaches other workers through a shared cache (see CACHES), and the
+short TTL bounds how long a missed invalidation can leave a stale list.
+"""
+
+from array import array
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from .models import Friendship
+
+
+CACHE_TTL = getattr(settings, 'FRIEND_GRAPH_CACHE_TTL', 60 * 5)
+
+
+def _key(user_id):
+    return f'friend_graph:{user_id}'
+
+
+def pack_ids(ids):
+    """Sorted int64 array bytes: the compact cache form of an id set"""
+    return array('q', sorted(ids)).tobytes()
+
+
+def unpack_ids(raw):
+    """Inverse of pack_ids"""
+    ids = array('q')
+    ids.frombytes(raw)
+    return ids.tolist()
+
+
+def _load(user_ids):
+    """Read adjacency lists for ``user_ids`` straight from the friendships table"""
+    user_ids = set(user_ids)
+    adjacency = {user_id: [] for user_id in user_ids}
+    pairs = Friendship.objects.filter(
+        Q(from_user_id__in=user_ids) | Q(to_user_id__in=user_ids),
+        status='accepted'
+    ).values_list('from_user_id', 'to_user_id')
+
+    for from_id, to_id in pairs:
+        if from_id in user_ids:
+            adjacency[from_id].append(to_id)
+        if to_id in user_ids:
+            adjacency[to_id].append(from_id)
+    return {user_id: sorted(ids) for user_id, ids in adjacency.items()}
+
+
+def friends_of(user_ids):
+    """Sorted friend id lists for a batch of users: {user_id: [friend_id, ...]}
+
+    Cache misses are filled with a single query.
+    """
+    user_ids = list(user_ids)
+    cached = cache.get_many([_key(user_id) for user_id in user_ids])
+    result = {}
+    missing = []
+    for user_id in user_ids:
+        raw = cached.get(_key(user_id))
+        if raw is None:
+            missing.append(user_id)
+        else:
+            result[user_id] = unpack_ids(raw)
+
+    if missing:
+        loaded = _load(missing)
+        cache.set_many({_key(user_id): pack_ids(ids) for user_id, ids in loaded.items()}, CACHE_TTL)
+        result.update(loaded)
+    return result
+
+
+def friend_ids(user_id):
+    """Sorted ids of a user's accepted friends"""
+    return friends_of([user_id])[user_id]
+
+
+def friend_count(user_id):
+    """Number of accepted friends"""
+    return len(friend_ids(user_id))
+
+
+def are_friends(user_id, other_id):
+    """Whether two users have an accepted friendship"""
+    ids = friend_ids(user_id)
+    index = bisect_left(ids, other_id)
+    return index < len(ids) and ids[index] == other_id
+
+
+def count_mutual(friends, candidate_lists, samples=3):
+    """Intersect one friend set with many candidate friend lists
+
+    ``friends`` is a set, ``candidate_lists`` maps candidate id to a friend
+    id list; returns {candidate_id: (count, [first ``samples`` mutual ids])}.
+    Each candidate costs one pass over its own list.
+    """
+    result = {}
+    for candidate_id, ids in candidate_lists.items():
+        mutual = [friend_id for friend_id in ids if friend_id in friends]
+        result[candidate_id] = (len(mutual), mutual[:samples])
+    return result
+
+
+def mutual_friends(user_id, other_ids, samples=3):
+    """Mutual friend counts and a few sample ids between a user and a batch of others
+
+    Adjacency lists for the whole batch are fetched with one cache
+    round trip, so no per-pair queries are issued.
+    """
+    other_ids = [other_id for other_id in set(other_ids) if other_id != user_id]
+    adjacency = friends_of([user_id, *other_ids])
+    friends = set(adjacency.pop(user_id))
+    return count_mutual(friends, adjacency, samples)
+
+
+def invalidate(*user_ids):
+    """Forget cached adjacency lists after a friendship change"""
+    cache.delete_many([_key(user_id) for user_id in user_ids])
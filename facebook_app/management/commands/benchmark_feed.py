@@ -0,0 +1,118 @@
+"""
+Django management command comparing sync and async newsfeed/profile latency
+Drives both code paths in-process with a concurrent request load generator
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from facebook_app.models import User
+from facebook_app.post_cards import cache_stats
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks p50/p99 latency of the sync and async newsfeed and profile views'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to log in as (defaults to the first user)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests per path'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=20,
+            help='Requests in flight at once'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to benchmark with; run seed_data first')
+
+        total = options['requests']
+        concurrency = options['concurrency']
+        pairs = [
+            ('newsfeed', reverse('newsfeed'), reverse('newsfeed_async')),
+            ('profile', reverse('profile', args=[user.username]), reverse('profile_async', args=[user.username])),
+        ]
+
+        self.stdout.write(f'{total} requests per path, {concurrency} concurrent, as {user.username}')
+        for name, sync_url, async_url in pairs:
+            self.report(f'{name} (sync)', self.run_sync(user, sync_url, total, concurrency))
+            self.report(f'{name} (async)', asyncio.run(self.run_async(user, async_url, total, concurrency)))
+
+        stats = cache_stats()
+        self.stdout.write(
+            f"post card cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate)"
+        )
+
+    def run_sync(self, user, url, total, concurrency):
+        """Threaded load against the sync view, like a threaded WSGI worker"""
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            timings = []
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f'GET {url} returned {response.status_code}')
+            finally:
+                close_old_connections()
+            return timings
+
+        shares = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = [t for batch in pool.map(worker, shares) for t in batch]
+        return timings, time.perf_counter() - started
+
+    async def run_async(self, user, url, total, concurrency):
+        """Coroutine load against the async view, like an ASGI server"""
+        client = AsyncClient()
+        await client.aforce_login(user)
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'GET {url} returned {response.status_code}')
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(one() for _ in range(total)))
+        return list(timings), time.perf_counter() - started
+
+    def report(self, label, result):
+        timings, elapsed = result
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{label:<18} p50 {percentile(timings, 0.50) * 1000:8.1f} ms   '
+            f'p99 {percentile(timings, 0.99) * 1000:8.1f} ms   '
+            f'{len(timings) / elapsed:8.1f} req/s'
+        )
@@ -0,0 +1,84 @@
+"""
+Django management command benchmarking mutual-friend counting
+Times the adjacency-set intersection against growing friend-list sizes on
+synthetic lists, and optionally the full cached path for a real user
+"""
+
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from facebook_app.models import User
+from facebook_app import friend_graph
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks batched mutual-friend counts against friend-list size'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[50, 200, 1000, 5000],
+            help='Friend-list sizes to measure'
+        )
+        parser.add_argument(
+            '--candidates',
+            type=int,
+            default=50,
+            help='Candidates per batch (a page of search results or suggestions)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Batches timed per size'
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Also time the cached path for this username against their friends of friends'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        candidates = options['candidates']
+        repeat = options['repeat']
+
+        self.stdout.write(f'{candidates} candidates per batch, best of {repeat}')
+        for size in options['sizes']:
+            # Lists drawn from a population 20x the list size overlap by ~5%
+            population = range(size * 20)
+            friends = set(rng.sample(population, size))
+            lists = {c: sorted(rng.sample(population, size)) for c in range(candidates)}
+            best = min(self.time(friend_graph.count_mutual, friends, lists) for _ in range(repeat))
+            self.stdout.write(
+                f'{size:>7} friends   {best * 1000:8.2f} ms/batch   '
+                f'{best / candidates * 1e6:8.1f} us/candidate'
+            )
+
+        if options['user']:
+            self.run_user(options['user'], candidates)
+
+    def run_user(self, username, candidates):
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f'No user named {username}')
+
+        friends = friend_graph.friend_ids(user.id)
+        fof = {other_id for ids in friend_graph.friends_of(friends[:candidates]).values() for other_id in ids}
+        others = sorted(fof - {user.id})[:candidates]
+        ids = [user.id, *others]
+
+        friend_graph.invalidate(*ids)
+        cold = self.time(friend_graph.mutual_friends, user.id, others)
+        warm = self.time(friend_graph.mutual_friends, user.id, others)
+        self.stdout.write(
+            f'{username}: {len(friends)} friends, {len(others)} candidates   '
+            f'cold {cold * 1000:.2f} ms   warm {warm * 1000:.2f} ms'
+        )
+
+    def time(self, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - started
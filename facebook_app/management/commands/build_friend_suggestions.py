@@ -0,0 +1,36 @@
+"""
+Django management command to build "People You May Know" suggestions
+Incremental by default: only users whose friend neighbourhood changed are rebuilt
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from facebook_app.models import SuggestionInvalidation
+from facebook_app import suggestions
+
+
+class Command(BaseCommand):
+    help = 'Builds top-K friend suggestions ranked by mutual friends'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild suggestions for every user instead of only stale ones'
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=suggestions.TOP_K,
+            help='Number of suggestions stored per user'
+        )
+
+    def handle(self, *args, **options):
+        if options['full']:
+            started = timezone.now()
+            rebuilt = suggestions.build_suggestions(top_k=options['top_k'])
+            SuggestionInvalidation.objects.filter(created_at__lte=started).delete()
+        else:
+            rebuilt = suggestions.build_stale_suggestions(top_k=options['top_k'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt suggestions for {rebuilt} users'))
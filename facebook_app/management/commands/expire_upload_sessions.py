@@ -0,0 +1,24 @@
+"""
+Django management command to abort abandoned chunked uploads
+Schedule it periodically; removes the part files of sessions that stopped receiving chunks
+"""
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from facebook_app import uploads
+
+
+class Command(BaseCommand):
+    help = 'Aborts upload sessions idle for longer than --hours and deletes their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=24,
+            help='Idle time after which an upload is abandoned'
+        )
+
+    def handle(self, *args, **options):
+        expired = uploads.expire_sessions(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Aborted {expired} abandoned uploads'))
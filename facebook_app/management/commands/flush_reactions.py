@@ -0,0 +1,31 @@
+"""
+Django management command to flush the write-behind reaction buffer
+Schedule it periodically, or leave it running with --interval; a no-op when
+REACTION_WRITE_BEHIND is off
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from facebook_app import reaction_buffer
+
+
+class Command(BaseCommand):
+    help = 'Applies buffered reaction toggles to the database in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, flushing every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            ops, changed = reaction_buffer.flush()
+            self.stdout.write(self.style.SUCCESS(
+                f'Flushed {ops} buffered reactions, {changed} changed'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+"""
+Django management command to process post media the worker pool never finished
+Covers uploads queued when the web process exited and rows from before the pipeline
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from facebook_app.models import PostMedia
+from facebook_app import media
+
+
+class Command(BaseCommand):
+    help = 'Generates dimensions, thumbnails and display variants for pending post media'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry media whose processing failed'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=media.WORKERS,
+            help='Media processed in parallel'
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        media_ids = list(PostMedia.objects.filter(
+            processing_status__in=statuses
+        ).order_by('id').values_list('id', flat=True))
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            failed = sum(1 for ready in pool.map(media.process_queued, media_ids) if not ready)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {len(media_ids) - failed} media, {failed} failed'
+        ))
@@ -0,0 +1,69 @@
+"""
+Django management command to purge soft-deleted posts
+Schedule it periodically (e.g. cron every 10 minutes); each batch removes the
+posts' dependent rows with plain DELETEs by id chunk, then the posts and
+their stored media files
+"""
+
+import time
+from collections import Counter
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from facebook_app.models import Post
+from facebook_app import deletion
+
+
+class Command(BaseCommand):
+    help = 'Permanently deletes soft-deleted posts and their dependent rows in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=deletion.BATCH_SIZE,
+            help='Rows deleted per statement'
+        )
+        parser.add_argument(
+            '--posts-per-batch',
+            type=int,
+            default=100,
+            help='Posts purged per batch'
+        )
+        parser.add_argument(
+            '--grace-minutes',
+            type=int,
+            default=0,
+            help='Only purge posts deleted at least this long ago'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to ease database load'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+
+        posts_purged = 0
+        totals = Counter()
+        while True:
+            post_ids = list(
+                Post.objects.filter(deleted_at__lte=cutoff)
+                .order_by('deleted_at')
+                .values_list('id', flat=True)[:options['posts_per_batch']]
+            )
+            if not post_ids:
+                break
+
+            totals.update(deletion.purge_posts(post_ids, options['batch_size']))
+            posts_purged += len(post_ids)
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        for label, count in sorted(totals.items()):
+            if label != Post._meta.label and count:
+                self.stdout.write(f'  {label}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Purged {posts_purged} deleted posts'))
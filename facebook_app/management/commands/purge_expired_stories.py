@@ -0,0 +1,64 @@
+"""
+Django management command to sweep expired stories
+Schedule it periodically (e.g. cron every 10 minutes); each batch deletes the
+StoryView rows first and then the stories, with one DELETE per table
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from django.utils import timezone
+from facebook_app.models import Story, StoryView
+from facebook_app.deletion import delete_rows
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired stories and their views in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Stories deleted per batch'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to ease database load'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = timezone.now()
+        using = router.db_for_write(Story)
+
+        stories_deleted = views_deleted = 0
+        while True:
+            batch = list(
+                Story.objects.filter(expires_at__lte=cutoff)
+                .order_by('expires_at')
+                .values_list('id', 'media_file')[:batch_size]
+            )
+            if not batch:
+                break
+            story_ids = [story_id for story_id, _ in batch]
+
+            # Expired stories are already out of every cached tray, so skip
+            # the per-row collector and signals and issue plain DELETEs.
+            with transaction.atomic(using=using):
+                views_deleted += delete_rows(StoryView, story_ids, using, field='story')
+                stories_deleted += delete_rows(Story, story_ids, using)
+
+            storage = Story._meta.get_field('media_file').storage
+            for _, media_file in batch:
+                if media_file:
+                    storage.delete(media_file)
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {stories_deleted} expired stories and {views_deleted} story views'
+        ))
@@ -0,0 +1,51 @@
+"""
+Django management command to rematerialize newsfeeds
+Run after deploying the FeedEntry table, or to repair drifted feeds
+"""
+
+from collections import Counter
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from facebook_app.models import Friendship, User
+from facebook_app import feed
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds materialized newsfeeds and large-audience flags'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Only rebuild the feed of this username'
+        )
+
+    def handle(self, *args, **options):
+        self.update_large_audience()
+
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+
+        count = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            feed.rebuild_feed(user_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} feeds'))
+
+    def update_large_audience(self):
+        """Recompute which authors are served through the pull path"""
+        accepted = Friendship.objects.filter(status='accepted')
+        friend_counts = Counter()
+        for field in ('from_user', 'to_user'):
+            for row in accepted.values(field).annotate(total=Count('id')):
+                friend_counts[row[field]] += row['total']
+
+        large = [uid for uid, total in friend_counts.items() if total > feed.FANOUT_LIMIT]
+        User.objects.filter(large_audience=True).exclude(id__in=large).update(large_audience=False)
+        User.objects.filter(id__in=large).update(large_audience=True)
+        cache.delete(feed.LARGE_AUDIENCE_CACHE_KEY)
+
+        self.stdout.write(f'{len(large)} large-audience authors')
@@ -0,0 +1,104 @@
+"""
+Django management command to repair denormalized Post counters
+Recomputes comment, media and share counts and the per-type reaction tallies
+and rewrites only drifted rows
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from facebook_app.models import Comment, Post, PostMedia, PostReactionCount, Reaction
+
+
+COUNTERS = {
+    'comment_count': (Comment, 'post'),
+    'media_count': (PostMedia, 'post'),
+    'share_count': (Post, 'shared_post'),
+}
+
+
+def _actual(model, field):
+    """Correlated COUNT(*) of ``model`` rows pointing at the outer post"""
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def _repair_type_counts(post_ids):
+    """Rewrite drifted per-type reaction tallies for a batch of posts; returns how many"""
+    actual = {
+        (post_id, reaction_type): total
+        for post_id, reaction_type, total in Reaction.objects.filter(
+            post_id__in=post_ids
+        ).order_by().values_list('post_id', 'reaction_type').annotate(total=Count('id'))
+    }
+    stored = {
+        (post_id, reaction_type): count
+        for post_id, reaction_type, count in PostReactionCount.objects.filter(
+            post_id__in=post_ids
+        ).values_list('post_id', 'reaction_type', 'count')
+    }
+    drifted = [
+        PostReactionCount(post_id=post_id, reaction_type=reaction_type, count=actual.get((post_id, reaction_type), 0))
+        for post_id, reaction_type in actual.keys() | stored.keys()
+        if actual.get((post_id, reaction_type), 0) != stored.get((post_id, reaction_type), 0)
+    ]
+    if drifted:
+        PostReactionCount.objects.bulk_create(
+            drifted,
+            update_conflicts=True,
+            unique_fields=['post', 'reaction_type'],
+            update_fields=['count']
+        )
+    return len(drifted)
+
+
+class Command(BaseCommand):
+    help = 'Recomputes drifted comment/media/share counters and reaction tallies on posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts checked per query'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        annotations = {f'actual_{name}': _actual(*source) for name, source in COUNTERS.items()}
+
+        checked = repaired = retallied = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').annotate(**annotations)
+                .only('id', 'version', *COUNTERS)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            checked += len(batch)
+
+            retallied += _repair_type_counts([post.id for post in batch])
+
+            stale = []
+            for post in batch:
+                changed = False
+                for name in COUNTERS:
+                    actual = getattr(post, f'actual_{name}')
+                    if getattr(post, name) != actual:
+                        setattr(post, name, actual)
+                        changed = True
+                if changed:
+                    post.version += 1
+                    stale.append(post)
+
+            if stale:
+                Post.objects.bulk_update(stale, [*COUNTERS, 'version'])
+                repaired += len(stale)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} posts, repaired {repaired}, rewrote {retallied} reaction tallies'
+        ))
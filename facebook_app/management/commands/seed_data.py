@@ -3,6 +3,7 @@ Django management command to seed realistic Kenyan data
 Place this file at: facebook_app/management/commands/seed_data.py
 """
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password
@@ -50,6 +51,8 @@ class Command(BaseCommand):
         self.create_videos(users)
         self.create_fundraisers(users)
         self.create_notifications(users)
+        # Rows above are created directly, so bring post counters and reaction tallies in line
+        call_command('repair_post_counters', stdout=self.stdout)
         
         self.stdout.write(self.style.SUCCESS('Database seeded successfully!'))
 
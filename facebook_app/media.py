@@ -0,0 +1,128 @@
+"""
+media.py
+Post media processing off the request path
+
+Uploads are saved as they arrive and queued on a local thread pool once
+the creating transaction commits. A worker sniffs the real media type,
+records dimensions and writes a thumbnail and a feed-sized display image
+with Pillow. Anything left 'pending' or 'failed' (e.g. the process exited
+mid-queue) is picked up by the process_media management command.
+"""
+
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .models import Post, PostMedia
+
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, 'MEDIA_WORKERS', 4)
+
+THUMBNAIL_SIZE = getattr(settings, 'MEDIA_THUMBNAIL_SIZE', (320, 320))
+
+DISPLAY_SIZE = getattr(settings, 'MEDIA_DISPLAY_SIZE', (1080, 1080))
+
+JPEG_QUALITY = 85
+
+# Leading bytes of the video containers browsers play
+VIDEO_SIGNATURES = [
+    (4, b'ftyp'),               # MP4 / MOV
+    (0, b'\x1a\x45\xdf\xa3'),   # WebM / Matroska
+]
+
+_executor = None
+
+
+# ==================== QUEUE ====================
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='media')
+    return _executor
+
+
+def enqueue(media_ids):
+    """Process media on the worker pool once the current transaction commits"""
+    media_ids = list(media_ids)
+    transaction.on_commit(lambda: [_pool().submit(process_queued, media_id) for media_id in media_ids])
+
+
+def process_queued(media_id):
+    """process_media for worker threads: errors are logged and marked, never raised
+
+    Returns whether the media ended up 'ready'.
+    """
+    try:
+        return process_media(media_id).processing_status == 'ready'
+    except Exception:
+        logger.exception('Processing post media %s failed', media_id)
+        PostMedia.objects.filter(id=media_id).update(processing_status='failed')
+        return False
+    finally:
+        close_old_connections()
+
+
+# ==================== PROCESSING ====================
+
+def _is_video(header):
+    return any(header[offset:offset + len(magic)] == magic for offset, magic in VIDEO_SIGNATURES)
+
+
+def _encode(image, size):
+    """A JPEG no larger than ``size``, never upscaled"""
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def process_media(media_id):
+    """Detect type, record dimensions and write thumbnail/display variants for one PostMedia"""
+    media = PostMedia.objects.get(id=media_id)
+    with media.file.open('rb') as f:
+        header = f.read(16)
+        f.seek(0)
+        try:
+            image = Image.open(f)
+            image.load()
+        except (UnidentifiedImageError, OSError):
+            image = None
+
+    stem = os.path.splitext(os.path.basename(media.file.name))[0]
+    # Reprocessing replaces earlier variants rather than leaving them behind
+    for variant in (media.thumbnail, media.display_image):
+        if variant:
+            variant.delete(save=False)
+    if image is not None:
+        media.media_type = 'gif' if image.format == 'GIF' else 'image'
+        # Phones store rotation in EXIF; bake it in so width/height match what is shown
+        image = ImageOps.exif_transpose(image)
+        media.width, media.height = image.size
+        media.thumbnail.save(f'{stem}_thumb.jpg', _encode(image, THUMBNAIL_SIZE), save=False)
+        if media.media_type == 'image' and max(image.size) > max(DISPLAY_SIZE):
+            media.display_image.save(f'{stem}_display.jpg', _encode(image, DISPLAY_SIZE), save=False)
+        media.processing_status = 'ready'
+    elif _is_video(header):
+        # Dimensions and poster frames need a video decoder; none is bundled
+        media.media_type = 'video'
+        media.processing_status = 'ready'
+    else:
+        media.processing_status = 'failed'
+
+    media.save(update_fields=[
+        'media_type', 'width', 'height', 'thumbnail', 'display_image', 'processing_status'
+    ])
+    # Cached feed cards embed media URLs, so re-render them
+    Post.objects.filter(id=media.post_id).update(version=F('version') + 1)
+    return media
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facebook_app', '0002_feed_entries'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='feedentry',
+            name='feed_entrie_viewer__f92104_idx',
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['viewer', '-created_at', '-post'], name='feed_entrie_viewer__55a950_idx'),
+        ),
+    ]
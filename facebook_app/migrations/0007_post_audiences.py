@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facebook_app', '0006_friend_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostAudience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('include', 'Include'), ('exclude', 'Exclude')], max_length=10)),
+            ],
+            options={
+                'db_table': 'post_audiences',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['privacy', '-created_at'], name='posts_privacy_26a00d_idx'),
+        ),
+        migrations.AddField(
+            model_name='postaudience',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience', to='facebook_app.post'),
+        ),
+        migrations.AddField(
+            model_name='postaudience',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='postaudience',
+            unique_together={('post', 'user')},
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facebook_app', '0009_post_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='photos_user_id_b75154_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['album', '-created_at', '-id'], name='photos_album_i_798fb8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-is_pinned', '-created_at', '-id'], name='posts_author__3d4560_idx'),
+        ),
+    ]
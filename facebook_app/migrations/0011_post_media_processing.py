@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facebook_app', '0010_timeline_grid_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postmedia',
+            name='display_image',
+            field=models.ImageField(blank=True, null=True, upload_to='post_media_display/'),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
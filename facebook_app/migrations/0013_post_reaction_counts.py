@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facebook_app', '0012_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostReactionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reaction_type', models.CharField(choices=[('like', 'Like'), ('love', 'Love'), ('care', 'Care'), ('haha', 'Haha'), ('wow', 'Wow'), ('sad', 'Sad'), ('angry', 'Angry')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_counts', to='facebook_app.post')),
+            ],
+            options={
+                'db_table': 'post_reaction_counts',
+                'unique_together': {('post', 'reaction_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:43
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _actual(model, field):
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    """Fill reaction tallies and post counters for rows that predate their upkeep"""
+    Comment = apps.get_model('facebook_app', 'Comment')
+    Post = apps.get_model('facebook_app', 'Post')
+    PostMedia = apps.get_model('facebook_app', 'PostMedia')
+    PostReactionCount = apps.get_model('facebook_app', 'PostReactionCount')
+    Reaction = apps.get_model('facebook_app', 'Reaction')
+
+    PostReactionCount.objects.all().delete()
+    tallies = Reaction.objects.order_by().values_list('post_id', 'reaction_type').annotate(total=Count('id'))
+    PostReactionCount.objects.bulk_create(
+        (PostReactionCount(post_id=post_id, reaction_type=reaction_type, count=total)
+         for post_id, reaction_type, total in tallies.iterator()),
+        batch_size=1000
+    )
+    Post.objects.update(
+        comment_count=_actual(Comment, 'post'),
+        media_count=_actual(PostMedia, 'post'),
+        share_count=_actual(Post, 'shared_post')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facebook_app', '0016_post_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='post',
+            name='reaction_count',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def flatten_replies(apps, schema_editor):
+    """Re-parent replies nested deeper than one level onto their top-level comment"""
+    Comment = apps.get_model('facebook_app', 'Comment')
+
+    grandparent = Comment.objects.filter(pk=OuterRef('parent_comment_id')).values('parent_comment_id')[:1]
+    # Each pass lifts every nested reply one level, so this runs once per level of depth
+    while Comment.objects.filter(parent_comment__parent_comment__isnull=False).exists():
+        Comment.objects.filter(
+            parent_comment__parent_comment__isnull=False
+        ).update(parent_comment_id=Subquery(grandparent))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facebook_app', '0017_reaction_totals_from_tallies'),
+    ]
+
+    operations = [
+        migrations.RunPython(flatten_replies, migrations.RunPython.noop),
+    ]
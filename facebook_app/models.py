@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
@@ -29,6 +30,7 @@ class User(AbstractUser):
     website = models.URLField(blank=True)
     is_verified = models.BooleanField(default=False)
     is_online = models.BooleanField(default=False)
+    large_audience = models.BooleanField(default=False)  # feed is pulled at read time instead of fanned out
     last_seen = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -59,6 +61,31 @@ class Friendship(models.Model):
         ordering = ['-created_at']
 
 
+class FriendSuggestion(models.Model):
+    """Precomputed "People You May Know" rows, ranked by mutual friends"""
+    user = models.ForeignKey(User, related_name='friend_suggestions', on_delete=models.CASCADE)
+    suggested = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    mutual_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'friend_suggestions'
+        unique_together = ['user', 'suggested']
+        ordering = ['-mutual_count']
+        indexes = [
+            models.Index(fields=['user', '-mutual_count']),
+        ]
+
+
+class SuggestionInvalidation(models.Model):
+    """Users whose friend neighbourhood changed since suggestions were last built"""
+    user = models.OneToOneField(User, primary_key=True, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'suggestion_invalidations'
+
+
 class Follow(models.Model):
     """Allow users to follow others (like pages/profiles)"""
     follower = models.ForeignKey(User, related_name='following', on_delete=models.CASCADE)
@@ -103,6 +130,20 @@ class Post(models.Model):
     is_pinned = models.BooleanField(default=False)
     is_archived = models.BooleanField(default=False)
     comments_enabled = models.BooleanField(default=True)
+    # Set when the author deletes the post; it is hidden at once and its
+    # rows are removed later by purge_deleted_posts
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    
+    # Denormalized counters, kept in step with F() updates (see repair_post_counters);
+    # reaction totals live in post_reaction_counts so reacting never locks this row
+    comment_count = models.PositiveIntegerField(default=0)
+    media_count = models.PositiveIntegerField(default=0)
+    share_count = models.PositiveIntegerField(default=0)
+    
+    # Bumped whenever something a rendered post card shows changes, other than
+    # reaction tallies which cards are keyed on directly (see post_cards)
+    version = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -112,9 +153,28 @@ class Post(models.Model):
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['author', '-created_at']),
+            models.Index(fields=['privacy', '-created_at']),
+            models.Index(fields=['author', '-is_pinned', '-created_at', '-id']),
+            models.Index(fields=['deleted_at']),
         ]
 
 
+class PostAudience(models.Model):
+    """Per-user audience lists for friends_except, specific_friends and custom posts"""
+    MODE_CHOICES = [
+        ('include', 'Include'),
+        ('exclude', 'Exclude')
+    ]
+    
+    post = models.ForeignKey(Post, related_name='audience', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    
+    class Meta:
+        db_table = 'post_audiences'
+        unique_together = ['post', 'user']
+
+
 class PostMedia(models.Model):
     """Media attachments for posts (photos, videos)"""
     MEDIA_TYPE_CHOICES = [
@@ -123,20 +183,40 @@ class PostMedia(models.Model):
         ('gif', 'GIF')
     ]
     
+    PROCESSING_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed')
+    ]
+    
     post = models.ForeignKey(Post, related_name='media', on_delete=models.CASCADE)
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES)
     file = models.FileField(upload_to='post_media/')
     thumbnail = models.ImageField(upload_to='post_thumbnails/', null=True, blank=True)
+    display_image = models.ImageField(upload_to='post_media_display/', null=True, blank=True)  # resized for feeds
     description = models.CharField(max_length=500, blank=True)
     order = models.PositiveIntegerField(default=0)
     width = models.PositiveIntegerField(null=True, blank=True)
     height = models.PositiveIntegerField(null=True, blank=True)
     duration = models.PositiveIntegerField(null=True, blank=True)  # for videos in seconds
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'post_media'
         ordering = ['order', 'created_at']
+    
+    @property
+    def display_url(self):
+        """Feed-sized variant when the pipeline made one, else the original upload"""
+        return (self.display_image or self.file).url
+    
+    @property
+    def thumbnail_url(self):
+        """Small tile image; GIFs keep the original so they still animate"""
+        if self.media_type == 'gif' or not self.thumbnail:
+            return self.display_url
+        return self.thumbnail.url
 
 
 class Reaction(models.Model):
@@ -162,6 +242,17 @@ class Reaction(models.Model):
         ordering = ['-created_at']
 
 
+class PostReactionCount(models.Model):
+    """Per-type reaction tally for a post, maintained by the reactions service"""
+    post = models.ForeignKey(Post, related_name='reaction_counts', on_delete=models.CASCADE)
+    reaction_type = models.CharField(max_length=10, choices=Reaction.REACTION_CHOICES)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'post_reaction_counts'
+        unique_together = ['post', 'reaction_type']
+
+
 class Comment(models.Model):
     """Comments on posts"""
     post = models.ForeignKey(Post, related_name='comments', on_delete=models.CASCADE)
@@ -178,6 +269,10 @@ class Comment(models.Model):
     class Meta:
         db_table = 'comments'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'created_at']),
+            models.Index(fields=['parent_comment', 'created_at', 'id']),
+        ]
 
 
 class CommentReaction(models.Model):
@@ -201,6 +296,59 @@ class CommentReaction(models.Model):
         unique_together = ['user', 'comment']
 
 
+# ==================== NEWSFEED ====================
+
+class FeedEntry(models.Model):
+    """Materialized newsfeed row: one per (viewer, post) written on fan-out"""
+    viewer = models.ForeignKey(User, related_name='feed_entries', on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, related_name='feed_entries', on_delete=models.CASCADE)
+    author = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()  # copied from the post so the feed never joins posts to sort
+    
+    class Meta:
+        db_table = 'feed_entries'
+        unique_together = ['viewer', 'post']
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['viewer', '-created_at', '-post']),
+            models.Index(fields=['viewer', 'author']),
+        ]
+
+
+# ==================== UPLOADS ====================
+
+class UploadSession(models.Model):
+    """A chunked, resumable upload in progress (see uploads.py)"""
+    TARGET_CHOICES = [
+        ('post_media', 'Post Media'),
+        ('video', 'Video')
+    ]
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted')
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, related_name='upload_sessions', on_delete=models.CASCADE)
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)  # bytes on disk; the resume offset
+    checksum = models.CharField(max_length=64, blank=True)  # optional SHA-256 of the whole file
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'upload_sessions'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+
 # ==================== STORIES ====================
 
 class Story(models.Model):
@@ -232,6 +380,10 @@ class Story(models.Model):
         db_table = 'stories'
         ordering = ['-created_at']
         verbose_name_plural = 'Stories'
+        indexes = [
+            models.Index(fields=['user', 'expires_at']),
+            models.Index(fields=['expires_at']),
+        ]
 
 
 class StoryView(models.Model):
@@ -531,15 +683,25 @@ class Notification(models.Model):
     recipient = models.ForeignKey(User, related_name='notifications', on_delete=models.CASCADE)
     sender = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES)
+    # What the notification is about, e.g. 'post:42'; events on the same
+    # target are aggregated into one row
+    target_key = models.CharField(max_length=50, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    latest_actor_ids = models.JSONField(default=list, blank=True)
     title = models.CharField(max_length=200)
     message = models.TextField()
     link = models.URLField(blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'notifications'
-        ordering = ['-created_at']
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['recipient', '-updated_at']),
+            models.Index(fields=['recipient', 'notification_type', 'target_key', '-created_at']),
+        ]
 
 
 # ==================== PHOTOS/ALBUMS ====================
@@ -578,6 +740,10 @@ class Photo(models.Model):
     class Meta:
         db_table = 'photos'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['album', '-created_at', '-id']),
+        ]
 
 
 # ==================== MARKETPLACE ====================
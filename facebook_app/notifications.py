@@ -0,0 +1,110 @@
+"""
+notifications.py
+Aggregated notifications: one row per (recipient, type, target) and window
+
+A comment on a popular post updates the author's open "post_comment" row
+for that post (actor count, latest actors, message, unread flag) instead
+of inserting another row, so the notifications list stays one short index
+scan however busy the post is. A row stays open for aggregation for
+NOTIFICATION_AGGREGATE_WINDOW after it was created; the next event after
+that starts a new row.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Notification, User
+
+
+WINDOW = getattr(settings, 'NOTIFICATION_AGGREGATE_WINDOW', timedelta(days=1))
+
+# Distinct actors remembered per row, newest first; the list only shows a
+# few, the rest keep actor_count from double-counting repeat actors
+TRACKED_ACTORS = 50
+
+SHOWN_ACTORS = 3
+
+PAGE_SIZE = 50
+
+
+def _message(actor, actor_count, verb):
+    others = actor_count - 1
+    if not others:
+        return f'{actor.get_full_name()} {verb}'
+    return f'{actor.get_full_name()} and {others} other{"s" if others > 1 else ""} {verb}'
+
+
+def notify(recipient, actor, notification_type, verb, title, target_key='', link=''):
+    """Record that ``actor`` did ``verb`` for ``recipient``, aggregating into an open row
+
+    Returns the created or updated Notification, or None when the actor is
+    the recipient. ``actor_count`` counts distinct actors; past
+    TRACKED_ACTORS of them, someone acting again may be counted twice.
+    """
+    if recipient.id == actor.id:
+        return None
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Serializes aggregation per recipient so racing events share one row
+        list(User.objects.select_for_update().filter(id=recipient.id).values_list('id'))
+        notification = Notification.objects.filter(
+            recipient=recipient,
+            notification_type=notification_type,
+            target_key=target_key,
+            created_at__gte=now - WINDOW
+        ).order_by('-created_at').first()
+
+        if notification is None:
+            return Notification.objects.create(
+                recipient=recipient,
+                sender=actor,
+                notification_type=notification_type,
+                target_key=target_key,
+                latest_actor_ids=[actor.id],
+                title=title,
+                message=_message(actor, 1, verb),
+                link=link,
+                updated_at=now
+            )
+
+        previous = notification.latest_actor_ids or [notification.sender_id]
+        if actor.id not in previous:
+            notification.actor_count += 1
+        notification.latest_actor_ids = [actor.id, *[uid for uid in previous if uid != actor.id]][:TRACKED_ACTORS]
+        notification.sender = actor
+        notification.title = title
+        notification.message = _message(actor, notification.actor_count, verb)
+        notification.is_read = False
+        notification.updated_at = now
+        notification.save(update_fields=[
+            'sender', 'actor_count', 'latest_actor_ids', 'title', 'message', 'is_read', 'updated_at'
+        ])
+    return notification
+
+
+def recent_notifications(user, limit=PAGE_SIZE):
+    """The user's latest aggregated notifications, each with up to SHOWN_ACTORS ``latest_actors``"""
+    notifications = list(Notification.objects.filter(
+        recipient=user
+    ).select_related('sender').order_by('-updated_at')[:limit])
+
+    actor_ids = {uid for n in notifications for uid in n.latest_actor_ids[:SHOWN_ACTORS]}
+    actors = User.objects.in_bulk(actor_ids)
+    for notification in notifications:
+        if notification.latest_actor_ids:
+            notification.latest_actors = [
+                actors[uid] for uid in notification.latest_actor_ids[:SHOWN_ACTORS] if uid in actors
+            ]
+        else:
+            # Rows from before aggregation only know their sender
+            notification.latest_actors = [notification.sender] if notification.sender else []
+    return notifications
+
+
+def mark_read(notifications):
+    """Mark a page of notifications read in one UPDATE"""
+    unread = [n.id for n in notifications if not n.is_read]
+    if unread:
+        Notification.objects.filter(id__in=unread).update(is_read=True)
@@ -0,0 +1,117 @@
+"""
+post_cards.py
+Rendered post card fragments, cached across viewers
+
+A card is keyed by the post's version stamp (``version`` is bumped with
+every comment, share and media change; ``updated_at`` moves on edits), its
+reaction tallies (reactions never write the posts row) plus the only
+viewer-dependent parts it renders: the viewer's own reaction, whether
+they wrote the post, for shares which original they may see, and the set
+of users they block either way (preview comments by those are left out). The comment box, which shows the
+viewer's avatar, is rendered outside the cached fragment. Author names,
+avatars and relative timestamps are not part of the key, so entries carry
+a short TTL.
+"""
+
+import hashlib
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .models import Post
+from . import blocks, feed, reaction_buffer, reactions, shares
+from .friend_graph import pack_ids
+
+
+CACHE_TTL = getattr(settings, 'POST_CARD_CACHE_TTL', 60)
+
+HITS_KEY = 'post_card:hits'
+MISSES_KEY = 'post_card:misses'
+
+Card = namedtuple('Card', ['post_id', 'html'])
+
+
+def _key(post_id, version, updated_at, summary, reaction_type, is_owner, root_id, blocked):
+    tallies = '.'.join(f'{name}{count}' for name, count in sorted(summary['counts'].items()))
+    return (
+        f'post_card:{post_id}:{version}:{updated_at.timestamp()}:{tallies or "-"}:'
+        f'{reaction_type or "-"}:{int(is_owner)}:{root_id or "-"}:{blocked}'
+    )
+
+
+def _blocked_tag(viewer):
+    """'-' for the usual viewer who blocks nobody, else a digest of the block set"""
+    ids = blocks.blocked_ids(viewer.id)
+    return hashlib.sha1(pack_ids(ids)).hexdigest()[:16] if ids else '-'
+
+
+
+def _count(key, amount):
+    """Bump a hit/miss counter, creating it on first use"""
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key, amount)
+
+
+def cache_stats():
+    """Hit/miss counters since the cache was last cleared"""
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counts.get(HITS_KEY, 0)
+    misses = counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+
+def render_cards(viewer, post_ids, queryset=None):
+    """Rendered cards for ``post_ids`` in order, as a list of Card tuples
+
+    Light queries read the version stamps, reaction tallies, the viewer's
+    reactions and the shared originals they may see; only posts missing
+    from the cache are loaded with ``queryset`` and rendered. Any preview
+    comments it prefetches must already be filtered for ``viewer``.
+    """
+    stamps = {
+        post_id: (author_id, version, updated_at, shared_post_id)
+        for post_id, author_id, version, updated_at, shared_post_id in Post.objects.filter(
+            id__in=post_ids,
+            deleted_at__isnull=True
+        ).values_list('id', 'author_id', 'version', 'updated_at', 'shared_post_id')
+    }
+    post_ids = [post_id for post_id in post_ids if post_id in stamps]
+    # Includes reactions still waiting in the write-behind buffer
+    viewer_reactions = reaction_buffer.viewer_reactions(viewer.id, post_ids)
+
+    summaries = reactions.reaction_summaries(post_ids)
+    roots = shares.visible_roots(viewer, [stamps[post_id][3] for post_id in post_ids if stamps[post_id][3]])
+    blocked = _blocked_tag(viewer)
+
+    keys = {}
+    for post_id in post_ids:
+        author_id, version, updated_at, shared_post_id = stamps[post_id]
+        keys[post_id] = _key(
+            post_id, version, updated_at, summaries[post_id], viewer_reactions.get(post_id),
+            author_id == viewer.id, roots.get(shared_post_id), blocked
+        )
+
+    cached = cache.get_many(list(keys.values()))
+    missing = [post_id for post_id in post_ids if keys[post_id] not in cached]
+    _count(HITS_KEY, len(post_ids) - len(missing))
+    _count(MISSES_KEY, len(missing))
+
+    if missing:
+        posts = feed.load_posts(missing, queryset)
+        shares.attach_shared_originals(posts, roots)
+        rendered = {}
+        for post in posts:
+            post.reaction_summary = summaries[post.id]
+            post.viewer_reaction = viewer_reactions.get(post.id)
+            rendered[keys[post.id]] = render_to_string('partials/post_card.html', {'post': post, 'user': viewer})
+        cache.set_many(rendered, CACHE_TTL)
+        cached.update(rendered)
+
+    return [Card(post_id, mark_safe(cached[keys[post_id]])) for post_id in post_ids if keys[post_id] in cached]
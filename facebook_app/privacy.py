@@ -0,0 +1,81 @@
+"""
+privacy.py
+Post visibility compiled into a single queryset filter
+
+Post.privacy semantics:
+    public            everyone
+    friends           the author's friends
+    friends_except    friends, minus PostAudience 'exclude' rows
+    specific_friends  friends listed as PostAudience 'include' rows
+    custom            'include' rows, minus 'exclude' rows
+    only_me           the author only
+"""
+
+from django.db.models import Exists, OuterRef, Q
+from .models import PostAudience, User
+from . import friend_graph
+
+
+def _audience(viewer, prefix, mode):
+    return Exists(PostAudience.objects.filter(
+        post=OuterRef(f'{prefix}pk'),
+        user=viewer,
+        mode=mode
+    ))
+
+
+def visible_posts_q(viewer, prefix=''):
+    """Q selecting posts ``viewer`` may see
+
+    ``prefix`` points the lookups at a related post, e.g. ``'post__'`` when
+    filtering FeedEntry rows. Deleted posts are never visible. Friendship comes from the cached friend graph,
+    so the only per-row work is an indexed EXISTS on post_audiences for the
+    list-based modes.
+    """
+    live = Q(**{f'{prefix}deleted_at__isnull': True})
+    if not viewer.is_authenticated:
+        return live & Q(**{f'{prefix}privacy': 'public'})
+
+    def field(name):
+        return f'{prefix}{name}'
+
+    is_friend = Q(**{field('author_id__in'): friend_graph.friend_ids(viewer.id)})
+    included = _audience(viewer, prefix, 'include')
+    excluded = _audience(viewer, prefix, 'exclude')
+
+    return live & (
+        Q(**{field('author_id'): viewer.id}) |
+        Q(**{field('privacy'): 'public'}) |
+        (Q(**{field('privacy'): 'friends'}) & is_friend) |
+        (Q(**{field('privacy'): 'friends_except'}) & is_friend & ~excluded) |
+        (Q(**{field('privacy'): 'specific_friends'}) & is_friend & included) |
+        (Q(**{field('privacy'): 'custom'}) & included & ~excluded)
+    )
+
+
+def visible_posts(queryset, viewer, prefix=''):
+    """Restrict a queryset to rows whose post ``viewer`` may see"""
+    return queryset.filter(visible_posts_q(viewer, prefix))
+
+
+def set_audience(post, include_ids=(), exclude_ids=()):
+    """Replace a post's audience lists
+
+    Unknown user ids are dropped; specific_friends lists keep only the
+    author's friends.
+    """
+    known = set(User.objects.filter(
+        id__in=set(include_ids) | set(exclude_ids)
+    ).values_list('id', flat=True))
+    include_ids = known.intersection(include_ids)
+    exclude_ids = known.intersection(exclude_ids)
+    if post.privacy == 'specific_friends':
+        include_ids &= set(friend_graph.friend_ids(post.author_id))
+
+    PostAudience.objects.filter(post=post).delete()
+    rows = [PostAudience(post=post, user_id=user_id, mode='include') for user_id in set(include_ids)]
+    rows += [
+        PostAudience(post=post, user_id=user_id, mode='exclude')
+        for user_id in set(exclude_ids) - set(include_ids)
+    ]
+    PostAudience.objects.bulk_create(rows)
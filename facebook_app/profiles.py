@@ -0,0 +1,80 @@
+"""
+profiles.py
+Cached profile headers: a per-profile summary shared by every visitor and
+a per-(viewer, profile) relationship state, both invalidated by signals
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import Friendship, Photo, Post
+from . import friend_graph
+
+
+CACHE_TTL = getattr(settings, 'PROFILE_CACHE_TTL', 60 * 60)
+
+RECENT_PHOTOS = 9
+
+
+def _summary_key(user_id):
+    return f'profile_summary:{user_id}'
+
+
+def _relationship_key(viewer_id, user_id):
+    return f'profile_relationship:{viewer_id}:{user_id}'
+
+
+def profile_summary(user_id):
+    """{'friends_count', 'posts_count', 'photos_count', 'recent_photo_ids'} for a profile
+
+    Post and photo counts ignore privacy; only the owner is shown them.
+    """
+    summary = cache.get(_summary_key(user_id))
+    if summary is None:
+        recent = list(Photo.objects.filter(user_id=user_id).order_by('-created_at').values_list('id', flat=True)[:RECENT_PHOTOS])
+        summary = {
+            'friends_count': friend_graph.friend_count(user_id),
+            'posts_count': Post.objects.filter(author_id=user_id, is_archived=False, deleted_at__isnull=True).count(),
+            # Only counted when the recent page is full
+            'photos_count': len(recent) if len(recent) < RECENT_PHOTOS else Photo.objects.filter(user_id=user_id).count(),
+            'recent_photo_ids': recent,
+        }
+        cache.set(_summary_key(user_id), summary, CACHE_TTL)
+    return summary
+
+
+def recent_photos(user_id):
+    """The profile's most recent photos, fetched by primary key from the cached ids"""
+    photo_ids = profile_summary(user_id)['recent_photo_ids']
+    by_id = Photo.objects.in_bulk(photo_ids)
+    return [by_id[photo_id] for photo_id in photo_ids if photo_id in by_id]
+
+
+def relationship(viewer_id, user_id):
+    """{'is_friend', 'friend_request_sent', 'friend_request_received'} between two users"""
+    state = cache.get(_relationship_key(viewer_id, user_id))
+    if state is None:
+        pending = set(Friendship.objects.filter(
+            from_user_id__in=[viewer_id, user_id],
+            to_user_id__in=[viewer_id, user_id],
+            status='pending'
+        ).values_list('from_user_id', flat=True))
+        state = {
+            'is_friend': friend_graph.are_friends(viewer_id, user_id),
+            'friend_request_sent': viewer_id in pending,
+            'friend_request_received': user_id in pending,
+        }
+        cache.set(_relationship_key(viewer_id, user_id), state, CACHE_TTL)
+    return state
+
+
+def invalidate_summary(*user_ids):
+    """Forget cached summaries after a friendship, post or photo change"""
+    cache.delete_many([_summary_key(user_id) for user_id in user_ids])
+
+
+def invalidate_relationship(user_a_id, user_b_id):
+    """Forget the cached state of a pair, as seen from both sides"""
+    cache.delete_many([
+        _relationship_key(user_a_id, user_b_id),
+        _relationship_key(user_b_id, user_a_id),
+    ])
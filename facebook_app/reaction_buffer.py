@@ -0,0 +1,231 @@
+"""
+reaction_buffer.py
+Optional write-behind mode for reactions on very hot posts
+
+With REACTION_WRITE_BEHIND on, a reaction click only records the user's
+final state for the post in the cache and appends (post, user) to a
+numbered op log; no database write happens on the request. Flushes walk the
+log, coalesce it to one final state per (post, user) and apply each post's
+states with reactions.apply_states. States are absolute, so a flush that
+runs twice (or two flushers racing) is harmless. Until the flush lands the
+user sees their own reaction from the buffer; aggregate counts catch up on
+the flush. A post whose states fail to apply has its pairs logged again and
+is retried by later flushes.
+
+The buffer lives in the default cache. Flushing from a separate process
+(the flush_reactions command) needs a cache shared between processes;
+every FLUSH_EVERY ops the web process also flushes in the background.
+"""
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from .models import Post, Reaction
+from . import reactions
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = getattr(settings, 'REACTION_WRITE_BEHIND', False)
+
+# Long enough to outlive several missed flushes
+BUFFER_TTL = getattr(settings, 'REACTION_BUFFER_TTL', 60 * 60)
+
+FLUSH_EVERY = getattr(settings, 'REACTION_BUFFER_FLUSH_EVERY', 500)
+
+# Flushes a failing post is retried on before its states are dropped
+MAX_ATTEMPTS = getattr(settings, 'REACTION_BUFFER_MAX_ATTEMPTS', 5)
+
+FLUSH_BATCH = 1000
+
+SEQ_KEY = 'reaction_buffer:seq'
+FLUSHED_KEY = 'reaction_buffer:flushed'
+GAP_KEY = 'reaction_buffer:gap'
+
+REMOVED = '-'
+
+_executor = None
+
+
+def _state_key(post_id, user_id):
+    return f'reaction_buffer:{post_id}:{user_id}'
+
+
+def _op_key(seq):
+    return f'reaction_buffer:op:{seq}'
+
+
+def _attempts_key(post_id):
+    return f'reaction_buffer:attempts:{post_id}'
+
+
+def _next_seq():
+    try:
+        return cache.incr(SEQ_KEY)
+    except ValueError:
+        cache.add(SEQ_KEY, 0, None)
+        return cache.incr(SEQ_KEY)
+
+
+# ==================== WRITES ====================
+
+def react(user, post_id, reaction_type):
+    """reactions.react, buffered when write-behind is on; same return value"""
+    if not ENABLED:
+        return reactions.react(user, post_id, reaction_type)
+    if reaction_type not in reactions.REACTION_TYPES:
+        raise ValueError('Unknown reaction type')
+
+    buffered = buffered_reactions(user.id, [post_id]).get(post_id)
+    if buffered is None:
+        previous = Reaction.objects.filter(
+            user=user,
+            post_id=post_id
+        ).values_list('reaction_type', flat=True).first()
+    else:
+        # A buffered removal wins over the row still waiting to be deleted
+        previous = None if buffered == REMOVED else buffered
+    new = None if previous == reaction_type else reaction_type
+
+    # State before op: a flush that sees the op always finds the state
+    cache.set(_state_key(post_id, user.id), new or REMOVED, BUFFER_TTL)
+    seq = _log(post_id, user.id)
+    if seq % FLUSH_EVERY == 0:
+        _pool().submit(_flush_in_background)
+    return reactions.toggle_status(previous, new), previous
+
+
+def _log(post_id, user_id):
+    """Append (post, user) to the op log; returns its seq"""
+    seq = _next_seq()
+    cache.set(_op_key(seq), (post_id, user_id), BUFFER_TTL)
+    return seq
+
+
+# ==================== READS ====================
+
+def buffered_reactions(user_id, post_ids):
+    """The user's unflushed reaction states: {post_id: type or REMOVED}"""
+    if not ENABLED or not post_ids:
+        return {}
+    keys = {_state_key(post_id, user_id): post_id for post_id in post_ids}
+    return {keys[key]: state for key, state in cache.get_many(list(keys)).items()}
+
+
+def viewer_reactions(user_id, post_ids):
+    """{post_id: reaction_type} for the viewer, buffered states overriding stored rows"""
+    current = dict(Reaction.objects.filter(
+        user_id=user_id,
+        post_id__in=post_ids
+    ).values_list('post_id', 'reaction_type'))
+    for post_id, state in buffered_reactions(user_id, post_ids).items():
+        if state == REMOVED:
+            current.pop(post_id, None)
+        else:
+            current[post_id] = state
+    return current
+
+
+# ==================== FLUSHING ====================
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reaction-flush')
+    return _executor
+
+
+def _flush_in_background():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Flushing buffered reactions failed')
+    finally:
+        close_old_connections()
+
+
+def _read_ops(start, head):
+    """Ops start..head as [(post_id, user_id)] and the last seq they cover
+
+    An op missing from the cache may still be in flight (the seq was taken
+    but the op not yet written), so reading stops there; if the same op is
+    still missing on the next flush it was evicted and is skipped.
+    """
+    ops = []
+    seq = start - 1
+    gap = cache.get(GAP_KEY)
+    while seq < head:
+        batch = range(seq + 1, min(seq + FLUSH_BATCH, head) + 1)
+        found = cache.get_many([_op_key(n) for n in batch])
+        for n in batch:
+            op = found.get(_op_key(n))
+            if op is None and n != gap:
+                cache.set(GAP_KEY, n, None)
+                return ops, seq
+            if op is not None:
+                ops.append(op)
+            seq = n
+    return ops, seq
+
+
+def flush():
+    """Apply every buffered reaction state logged since the last flush
+
+    Returns (ops_read, reactions_changed).
+    """
+    start = cache.get(FLUSHED_KEY, 0) + 1
+    head = cache.get(SEQ_KEY, 0)
+    if head < start:
+        return 0, 0
+
+    ops, last = _read_ops(start, head)
+    pairs = set(ops)
+    states = cache.get_many([_state_key(post_id, user_id) for post_id, user_id in pairs])
+    by_post = defaultdict(dict)
+    for post_id, user_id in pairs:
+        state = states.get(_state_key(post_id, user_id))
+        if state is not None:
+            by_post[post_id][user_id] = None if state == REMOVED else state
+
+    changed = 0
+    live = set(Post.objects.filter(
+        id__in=list(by_post),
+        deleted_at__isnull=True
+    ).values_list('id', flat=True))
+    for post_id in sorted(live):
+        try:
+            changed += reactions.apply_states(post_id, by_post[post_id])
+        except Exception:
+            # One bad post (e.g. a reactor deleted meanwhile) must not wedge the log
+            _retry_later(post_id, by_post[post_id])
+        else:
+            cache.delete(_attempts_key(post_id))
+
+    cache.set(FLUSHED_KEY, last, None)
+    cache.delete_many([_op_key(n) for n in range(start, last + 1)])
+    return len(ops), changed
+
+
+def _retry_later(post_id, states):
+    """Log a failed post's pairs again so a later flush retries them
+
+    Their buffered states are kept alive meanwhile. After MAX_ATTEMPTS
+    failed flushes the states are dropped, with an error naming the post.
+    """
+    attempts = cache.get(_attempts_key(post_id), 0) + 1
+    if attempts >= MAX_ATTEMPTS:
+        logger.exception(
+            'Dropping %d buffered reactions for post %s after %d failed flushes',
+            len(states), post_id, attempts
+        )
+        cache.delete_many([_state_key(post_id, user_id) for user_id in states] + [_attempts_key(post_id)])
+        return
+
+    logger.exception('Flushing buffered reactions for post %s failed, will retry', post_id)
+    cache.set(_attempts_key(post_id), attempts, BUFFER_TTL)
+    for user_id in states:
+        cache.touch(_state_key(post_id, user_id), BUFFER_TTL)
+        _log(post_id, user_id)
@@ -0,0 +1,187 @@
+"""
+reactions.py
+Reacting to posts, and per-post reaction breakdowns for a batch of posts
+
+A reaction write first claims its (user, post) key: an INSERT ... ON
+CONFLICT DO NOTHING RETURNING adds the reaction outright when the user had
+none, and otherwise the existing row is locked with SELECT ... FOR UPDATE
+and then updated or deleted. The counter upserts follow in the same
+transaction. Only reaction and counter rows are locked, so reacting never
+waits on unrelated writes to the users or posts rows. Counters are per
+(post, type) rows in post_reaction_counts, touched in a fixed order so
+concurrent reactors on the same post never deadlock. The posts row itself
+is never written: totals are summed from the tallies and cached cards are
+keyed on them (see post_cards).
+"""
+
+from collections import Counter, defaultdict
+from django.db import connections, router, transaction
+from django.utils import timezone
+from .models import PostReactionCount, Reaction
+
+
+TOP_TYPES = 3
+
+REACTION_TYPES = dict(Reaction.REACTION_CHOICES)
+
+
+def _empty_summary():
+    return {'counts': {}, 'top': [], 'total': 0}
+
+
+def reaction_summaries(post_ids):
+    """Per-type counts and the top reaction types for a batch of posts
+
+    Returns {post_id: {'counts': {type: n}, 'top': [type, ...], 'total': n}}
+    read from the maintained per-type counters in one query.
+    """
+    summaries = defaultdict(_empty_summary)
+    rows = PostReactionCount.objects.filter(
+        post_id__in=post_ids,
+        count__gt=0
+    ).values_list('post_id', 'reaction_type', 'count')
+
+    for post_id, reaction_type, total in rows:
+        summary = summaries[post_id]
+        summary['counts'][reaction_type] = total
+        summary['total'] += total
+
+    for summary in summaries.values():
+        ranked = sorted(summary['counts'].items(), key=lambda item: (-item[1], item[0]))
+        summary['top'] = [reaction_type for reaction_type, _ in ranked[:TOP_TYPES]]
+    return summaries
+
+
+def attach_reaction_summaries(posts):
+    """Set ``post.reaction_summary`` on every post for the templates"""
+    posts = list(posts)
+    summaries = reaction_summaries([post.id for post in posts])
+    for post in posts:
+        post.reaction_summary = summaries[post.id]
+    return posts
+
+
+# ==================== WRITES ====================
+
+def _bump_counts(post_id, deltas):
+    """Upsert per-type counters: one INSERT ... ON CONFLICT per changed type"""
+    connection = connections[router.db_for_write(PostReactionCount)]
+    table = connection.ops.quote_name(PostReactionCount._meta.db_table)
+    sql = f'''
+        INSERT INTO {table} (post_id, reaction_type, count) VALUES (%s, %s, %s)
+        ON CONFLICT (post_id, reaction_type) DO UPDATE SET count = {table}.count + EXCLUDED.count
+    '''
+    with connection.cursor() as cursor:
+        # Sorted so every transaction locks counter rows in the same order
+        for reaction_type, delta in sorted(deltas.items()):
+            cursor.execute(sql, [post_id, reaction_type, delta])
+
+
+def _claim(post_id, states):
+    """Lock the reaction keys of {user_id: type or None} on one post
+
+    Users with no reaction yet get their requested type inserted, which
+    takes the key; the other keys are row-locked in user order. Returns
+    (inserted user ids, {user_id: current type} for the locked rows).
+    """
+    connection = connections[router.db_for_write(Reaction)]
+    table = connection.ops.quote_name(Reaction._meta.db_table)
+    inserted, existing = set(), {}
+    todo = set(states)
+    while todo:
+        wanted = sorted(user_id for user_id in todo if states[user_id])
+        if wanted:
+            created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+            values = ', '.join(['(%s, %s, %s, %s)'] * len(wanted))
+            sql = f'''
+                INSERT INTO {table} (user_id, post_id, reaction_type, created_at) VALUES {values}
+                ON CONFLICT (user_id, post_id) DO NOTHING RETURNING user_id
+            '''
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [
+                    value for user_id in wanted for value in (user_id, post_id, states[user_id], created_at)
+                ])
+                inserted.update(user_id for user_id, in cursor.fetchall())
+
+        locked = dict(Reaction.objects.select_for_update().filter(
+            post_id=post_id,
+            user_id__in=sorted(todo - inserted)
+        ).order_by('user_id').values_list('user_id', 'reaction_type'))
+        existing.update(locked)
+        # A row that blocked the insert may be deleted before it is locked: claim it again
+        todo = {user_id for user_id in wanted if user_id not in inserted and user_id not in locked}
+    return inserted, existing
+
+
+def _apply(post_id, changes):
+    """Write [(user_id, previous, new), ...] for one post; ``new`` None removes
+
+    Additions were already inserted by _claim, so this is one upsert for
+    the changed reactions, one DELETE for the removed ones, then the
+    counters.
+    """
+    upserts = [
+        Reaction(user_id=user_id, post_id=post_id, reaction_type=new)
+        for user_id, previous, new in changes if previous and new
+    ]
+    removals = [user_id for user_id, previous, new in changes if not new]
+    deltas = Counter()
+    for user_id, previous, new in changes:
+        if previous:
+            deltas[previous] -= 1
+        if new:
+            deltas[new] += 1
+
+    if upserts:
+        Reaction.objects.bulk_create(
+            upserts,
+            update_conflicts=True,
+            unique_fields=['user', 'post'],
+            update_fields=['reaction_type']
+        )
+    if removals:
+        Reaction.objects.filter(post_id=post_id, user_id__in=removals).delete()
+
+    _bump_counts(post_id, {reaction_type: delta for reaction_type, delta in deltas.items() if delta})
+
+
+def toggle_status(previous, new):
+    """'added', 'changed' or 'removed' for a reaction moving from ``previous`` to ``new``"""
+    if new is None:
+        return 'removed'
+    return 'added' if previous is None else 'changed'
+
+
+def react(user, post_id, reaction_type):
+    """Add, change or toggle off a user's reaction to a post
+
+    Returns (status, previous_type) where status is 'added', 'changed' or
+    'removed'. Raises ValueError for an unknown reaction type.
+    """
+    if reaction_type not in REACTION_TYPES:
+        raise ValueError('Unknown reaction type')
+
+    with transaction.atomic():
+        _, existing = _claim(post_id, {user.id: reaction_type})
+        previous = existing.get(user.id)
+        new = None if previous == reaction_type else reaction_type
+        _apply(post_id, [(user.id, previous, new)])
+    return toggle_status(previous, new), previous
+
+
+def apply_states(post_id, states):
+    """Bring users' reactions on one post to final states {user_id: type or None}
+
+    Used by batched writers; users already in the requested state are
+    skipped. Returns how many reactions changed.
+    """
+    with transaction.atomic():
+        inserted, existing = _claim(post_id, states)
+        changes = [
+            (user_id, None if user_id in inserted else existing.get(user_id), new)
+            for user_id, new in sorted(states.items())
+            if user_id in inserted or existing.get(user_id) != new
+        ]
+        if changes:
+            _apply(post_id, changes)
+    return len(changes)
@@ -0,0 +1,98 @@
+"""
+relationships.py
+Viewer-to-user relationship states for whole lists of users at once
+
+Friendship and block membership come from the cached friend graph and
+block sets; pending requests and follows are one query each, so a list of
+any length costs at most two queries.
+"""
+
+from collections import namedtuple
+from django.db.models import Q
+from .models import Follow, Friendship, User
+from . import blocks, friend_graph
+
+
+class Relationship(namedtuple('Relationship', [
+    'is_self', 'is_friend', 'request_sent', 'request_received', 'is_blocked', 'is_following'
+])):
+    """How the viewer relates to one listed user"""
+
+    @property
+    def state(self):
+        """The single state a list row should show, strongest first"""
+        if self.is_self:
+            return 'self'
+        if self.is_blocked:
+            return 'blocked'
+        if self.is_friend:
+            return 'friend'
+        if self.request_sent:
+            return 'request_sent'
+        if self.request_received:
+            return 'request_received'
+        return 'none'
+
+
+def relationship_states(viewer, user_ids):
+    """{user_id: Relationship} for every id in ``user_ids``"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+
+    friends = set(friend_graph.friend_ids(viewer.id))
+    blocked = set(blocks.blocked_ids(viewer.id))
+
+    sent, received = set(), set()
+    for from_id, to_id in Friendship.objects.filter(
+        Q(from_user=viewer, to_user_id__in=user_ids) |
+        Q(from_user_id__in=user_ids, to_user=viewer),
+        status='pending'
+    ).values_list('from_user_id', 'to_user_id'):
+        if from_id == viewer.id:
+            sent.add(to_id)
+        else:
+            received.add(from_id)
+
+    following = set(Follow.objects.filter(
+        follower=viewer,
+        following_id__in=user_ids
+    ).values_list('following_id', flat=True))
+
+    return {
+        user_id: Relationship(
+            is_self=user_id == viewer.id,
+            is_friend=user_id in friends,
+            request_sent=user_id in sent,
+            request_received=user_id in received,
+            is_blocked=user_id in blocked,
+            is_following=user_id in following,
+        )
+        for user_id in user_ids
+    }
+
+
+def attach_relationships(viewer, users):
+    """Set ``user.relationship`` on every user for the templates"""
+    users = list(users)
+    states = relationship_states(viewer, [user.id for user in users])
+    for user in users:
+        user.relationship = states[user.id]
+    return users
+
+
+def attach_mutual_friends(viewer, users, samples=3):
+    """Set ``user.mutual_friends_count`` and ``user.mutual_friends_sample`` on every user
+
+    Counts come from the cached adjacency lists; the sample users for the
+    whole list are loaded with one query.
+    """
+    users = list(users)
+    mutual = friend_graph.mutual_friends(viewer.id, [user.id for user in users], samples)
+    sample_ids = {friend_id for _, ids in mutual.values() for friend_id in ids}
+    sample_users = User.objects.in_bulk(sample_ids) if sample_ids else {}
+    for user in users:
+        count, ids = mutual.get(user.id, (0, []))
+        user.mutual_friends_count = count
+        user.mutual_friends_sample = [sample_users[friend_id] for friend_id in ids if friend_id in sample_users]
+    return users
@@ -0,0 +1,76 @@
+"""
+shares.py
+Batch resolution of shared posts to the original they point at
+
+A share of a share renders the root original, so each ``shared_post``
+chain is walked to its end with one recursive CTE, and the roots are then
+loaded with their authors and media. Roots are checked against the
+viewer's visibility, so the root shown (or its absence) is part of the
+card's cache key. That is four queries per batch of posts however deep the
+chains are.
+"""
+
+from django.conf import settings
+from django.db import connections, router
+from .models import Post
+from .privacy import visible_posts
+
+
+# Chains longer than this (or cyclic ones) are treated as unavailable
+MAX_DEPTH = getattr(settings, 'SHARE_CHAIN_MAX_DEPTH', 10)
+
+
+def resolve_roots(post_ids):
+    """Map each post id to the root of its shared_post chain
+
+    A chain ending in a share whose original was deleted (SET_NULL leaves
+    a 'shared' post with no shared_post) has no root and is left out.
+    """
+    post_ids = list(set(post_ids))
+    if not post_ids:
+        return {}
+
+    connection = connections[router.db_for_read(Post)]
+    table = connection.ops.quote_name(Post._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    sql = f'''
+        WITH RECURSIVE chain (start_id, current_id, next_id, post_type, depth) AS (
+            SELECT id, id, shared_post_id, post_type, 0 FROM {table} WHERE id IN ({placeholders})
+            UNION ALL
+            SELECT chain.start_id, p.id, p.shared_post_id, p.post_type, chain.depth + 1
+            FROM chain JOIN {table} p ON p.id = chain.next_id
+            WHERE chain.depth < %s
+        )
+        SELECT start_id, current_id, post_type FROM chain WHERE next_id IS NULL
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*post_ids, MAX_DEPTH])
+        return {
+            start_id: root_id
+            for start_id, root_id, post_type in cursor.fetchall()
+            if post_type != 'shared'
+        }
+
+
+def visible_roots(viewer, shared_post_ids):
+    """Map each shared_post id to its root original, for roots ``viewer`` may see"""
+    roots = resolve_roots(shared_post_ids)
+    visible = set(visible_posts(
+        Post.objects.filter(id__in=set(roots.values())), viewer
+    ).values_list('id', flat=True))
+    return {shared_post_id: root_id for shared_post_id, root_id in roots.items() if root_id in visible}
+
+
+def attach_shared_originals(posts, roots):
+    """Set ``post.shared_original`` (the root Post, or None) on every post
+
+    ``roots`` comes from visible_roots, so an original the viewer may not
+    see is left as None and renders as unavailable. Originals come with
+    their author selected and media prefetched, so rendering a shared card
+    issues no further queries.
+    """
+    posts = list(posts)
+    originals = Post.objects.select_related('author').prefetch_related('media').in_bulk(set(roots.values()))
+    for post in posts:
+        post.shared_original = originals.get(roots.get(post.shared_post_id))
+    return posts
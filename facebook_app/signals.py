@@ -0,0 +1,139 @@
+"""
+signals.py
+Model signal handlers that keep derived data in sync with writes
+"""
+
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import BlockedUser, FeedEntry, Friendship, Photo, Post, Story, StoryView, SuggestionInvalidation
+from . import blocks, feed, friend_graph, profiles, stories
+
+
+# ==================== NEWSFEED ====================
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Fan a new post out, or pull it back when archived"""
+    if created:
+        feed.fan_out_post(instance)
+        if instance.shared_post_id:
+            Post.objects.filter(id=instance.shared_post_id).update(
+                share_count=F('share_count') + 1,
+                version=F('version') + 1
+            )
+        return
+
+    if instance.deleted_at:
+        # Soft-deleted: out of every feed now, purge_deleted_posts does the rest
+        if update_fields is None or 'deleted_at' in update_fields:
+            feed.remove_post(instance)
+        return
+
+    if update_fields is not None and 'is_archived' not in update_fields:
+        return
+
+    if instance.is_archived:
+        feed.remove_post(instance)
+    elif not FeedEntry.objects.filter(viewer_id=instance.author_id, post=instance).exists():
+        # Unarchived: it was removed from every feed, so write it again
+        feed.fan_out_post(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    """Shares of this post will render it as unavailable, so re-render their cards"""
+    if instance.deleted_at:
+        # Already done by soft_delete_post
+        return
+    Post.objects.filter(shared_post_id=instance.id).update(version=F('version') + 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """A deleted share no longer counts towards the original"""
+    if instance.shared_post_id and not instance.deleted_at:
+        Post.objects.filter(
+            id=instance.shared_post_id,
+            share_count__gt=0
+        ).update(share_count=F('share_count') - 1, version=F('version') + 1)
+
+
+@receiver(post_save, sender=Friendship)
+def friendship_saved(sender, instance, created, **kwargs):
+    """Connect feeds on accept, disconnect when a friendship is downgraded"""
+    friend_graph.invalidate(instance.from_user_id, instance.to_user_id)
+    stories.invalidate(instance.from_user_id, instance.to_user_id)
+    profiles.invalidate_summary(instance.from_user_id, instance.to_user_id)
+    profiles.invalidate_relationship(instance.from_user_id, instance.to_user_id)
+    mark_suggestions_stale(instance.from_user_id, instance.to_user_id)
+    if instance.status == 'accepted':
+        feed.connect_feeds(instance.from_user_id, instance.to_user_id)
+    elif not created:
+        feed.disconnect_feeds(instance.from_user_id, instance.to_user_id)
+
+
+@receiver(post_delete, sender=Friendship)
+def friendship_deleted(sender, instance, **kwargs):
+    """Unfriend removes each other's posts from both feeds"""
+    friend_graph.invalidate(instance.from_user_id, instance.to_user_id)
+    stories.invalidate(instance.from_user_id, instance.to_user_id)
+    profiles.invalidate_summary(instance.from_user_id, instance.to_user_id)
+    profiles.invalidate_relationship(instance.from_user_id, instance.to_user_id)
+    mark_suggestions_stale(instance.from_user_id, instance.to_user_id)
+    if instance.status == 'accepted':
+        feed.disconnect_feeds(instance.from_user_id, instance.to_user_id)
+
+
+# ==================== PROFILES ====================
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def profile_post_changed(sender, instance, **kwargs):
+    """New, archived or deleted posts change the author's post count"""
+    profiles.invalidate_summary(instance.author_id)
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def profile_photo_changed(sender, instance, **kwargs):
+    """Photo uploads and deletions change the recent photos grid"""
+    profiles.invalidate_summary(instance.user_id)
+
+
+# ==================== STORIES ====================
+
+@receiver(post_save, sender=Story)
+@receiver(post_delete, sender=Story)
+def story_changed(sender, instance, **kwargs):
+    """A new or removed story changes the tray of everyone who can see it"""
+    stories.invalidate_audience(instance.user_id)
+
+
+@receiver(post_save, sender=StoryView)
+def story_viewed(sender, instance, created, **kwargs):
+    """Viewing a story flips its bubble to seen for that viewer"""
+    if created:
+        stories.invalidate(instance.viewer_id)
+
+
+# ==================== FRIEND SUGGESTIONS ====================
+
+def mark_suggestions_stale(*user_ids):
+    """Queue users whose neighbourhood changed for the next incremental build"""
+    now = timezone.now()
+    SuggestionInvalidation.objects.bulk_create(
+        [SuggestionInvalidation(user_id=user_id, created_at=now) for user_id in set(user_ids)],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['created_at']
+    )
+
+
+@receiver(post_save, sender=BlockedUser)
+@receiver(post_delete, sender=BlockedUser)
+def block_changed(sender, instance, **kwargs):
+    """Blocking either way removes (or restores) the pair as a suggestion"""
+    blocks.invalidate(instance.blocker_id, instance.blocked_id)
+    mark_suggestions_stale(instance.blocker_id, instance.blocked_id)
@@ -0,0 +1,91 @@
+"""
+stories.py
+Stories tray: active stories grouped per user, cached per viewer until the
+earliest story in the tray expires
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Story, StoryView
+from . import friend_graph
+
+
+# Upper bound on how long a tray is cached even if nothing expires sooner
+MAX_TTL = getattr(settings, 'STORIES_TRAY_MAX_TTL', 300)
+
+
+def _key(user_id):
+    return f'stories_tray:{user_id}'
+
+
+def build_tray(viewer, friend_ids):
+    """One entry per user with active stories, the viewer first, then unseen, then by recency
+
+    Each entry is {'user', 'stories' (newest first), 'latest', 'has_unseen',
+    'next_story_id' (oldest unseen, else newest)}.
+    """
+    now = timezone.now()
+    active = list(Story.objects.filter(
+        user_id__in=[viewer.id, *friend_ids],
+        expires_at__gt=now
+    ).select_related('user').order_by('-created_at'))
+
+    seen = set(StoryView.objects.filter(
+        viewer=viewer,
+        story_id__in=[story.id for story in active]
+    ).values_list('story_id', flat=True))
+
+    trays = {}
+    for story in active:
+        tray = trays.get(story.user_id)
+        if tray is None:
+            tray = trays[story.user_id] = {
+                'user': story.user,
+                'stories': [],
+                'latest': story.created_at,
+                'has_unseen': False,
+                'next_story_id': story.id,
+            }
+        tray['stories'].append(story)
+        if story.id not in seen and story.user_id != viewer.id:
+            tray['has_unseen'] = True
+            # Stories arrive newest first, so the last unseen one is the oldest
+            tray['next_story_id'] = story.id
+
+    return sorted(
+        trays.values(),
+        key=lambda tray: (tray['user'].id != viewer.id, not tray['has_unseen'], -tray['latest'].timestamp())
+    )
+
+
+def stories_tray(viewer, friend_ids=None):
+    """Cached stories tray for a viewer
+
+    The TTL is the time until the first story in the tray expires, so an
+    expired story never outlives its cache entry.
+    """
+    tray = cache.get(_key(viewer.id))
+    if tray is not None:
+        return tray
+
+    if friend_ids is None:
+        friend_ids = friend_graph.friend_ids(viewer.id)
+    tray = build_tray(viewer, friend_ids)
+
+    ttl = MAX_TTL
+    expiries = [story.expires_at for entry in tray for story in entry['stories']]
+    if expiries:
+        ttl = min(ttl, max(1, int((min(expiries) - timezone.now()).total_seconds())))
+    cache.set(_key(viewer.id), tray, ttl)
+    return tray
+
+
+def invalidate(*user_ids):
+    """Drop cached trays, e.g. after a story is posted or viewed"""
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def invalidate_audience(author_id):
+    """Drop the trays of everyone who can see an author's stories"""
+    invalidate(author_id, *friend_graph.friend_ids(author_id))
@@ -0,0 +1,171 @@
+"""
+suggestions.py
+Offline "People You May Know" builder
+
+The accepted friendship graph is loaded once into a CSR (compressed sparse
+row) adjacency of NumPy arrays. For a user u, gathering the neighbour lists
+of all of u's friends yields every friend-of-friend once per shared friend,
+so counting each distinct value in that gather gives |N(u) ∩ N(c)| for
+every candidate c, at a cost that follows u's friends of friends rather
+than the size of the graph.
+"""
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .models import BlockedUser, Friendship, FriendSuggestion, SuggestionInvalidation, User
+
+
+TOP_K = 20
+
+# Friendship states that mean "do not suggest this pair"
+EXCLUDED_STATUSES = ['pending', 'blocked', 'declined']
+
+
+# ==================== GRAPH ====================
+
+class CSRGraph:
+    """Undirected graph over dense node indices, stored as indptr/indices arrays"""
+
+    def __init__(self, user_ids, edges):
+        # Dense index for every user id that appears in an edge
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.size = len(self.user_ids)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if len(edges):
+            edges = np.searchsorted(self.user_ids, edges)
+            # Store both directions, grouped by source and sorted by target
+            src = np.concatenate([edges[:, 0], edges[:, 1]])
+            dst = np.concatenate([edges[:, 1], edges[:, 0]])
+            order = np.lexsort((dst, src))
+            src, dst = src[order], dst[order]
+        else:
+            src = dst = np.empty(0, dtype=np.int64)
+        self.indices = dst
+        self.indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=self.size), out=self.indptr[1:])
+
+    def index_of(self, user_id):
+        """Dense index of a user id, or None when the user has no edges"""
+        i = np.searchsorted(self.user_ids, user_id)
+        if i < self.size and self.user_ids[i] == user_id:
+            return int(i)
+        return None
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def gather(self, nodes):
+        """Concatenated neighbour lists of ``nodes`` without a Python loop"""
+        starts = self.indptr[nodes]
+        lengths = self.indptr[nodes + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Offset of each gathered slot into self.indices
+        shift = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return self.indices[shift + np.arange(total)]
+
+
+def _pairs(queryset, *fields):
+    return np.fromiter(
+        (value for row in queryset.values_list(*fields).iterator() for value in row),
+        dtype=np.int64
+    )
+
+
+def load_graphs():
+    """(friend graph, exclusion graph) over the same dense id space"""
+    friend_edges = _pairs(Friendship.objects.filter(status='accepted'), 'from_user_id', 'to_user_id')
+    excluded_edges = np.concatenate([
+        _pairs(Friendship.objects.filter(status__in=EXCLUDED_STATUSES), 'from_user_id', 'to_user_id'),
+        _pairs(BlockedUser.objects.all(), 'blocker_id', 'blocked_id'),
+    ])
+    user_ids = np.unique(np.concatenate([friend_edges, excluded_edges]))
+    return CSRGraph(user_ids, friend_edges), CSRGraph(user_ids, excluded_edges)
+
+
+# ==================== RANKING ====================
+
+def rank_candidates(friends, excluded, i, top_k=TOP_K):
+    """Top-K (dense index, mutual count) pairs for the node at index ``i``"""
+    direct = friends.neighbors(i)
+    fof = friends.gather(direct)
+    if not len(fof):
+        return []
+
+    candidates, counts = np.unique(fof, return_counts=True)
+    keep = ~np.isin(candidates, np.concatenate([[i], direct, excluded.neighbors(i)]))
+    candidates, counts = candidates[keep], counts[keep]
+
+    # Most mutual friends first, ties broken by user id so rebuilds are stable
+    order = np.lexsort((friends.user_ids[candidates], -counts))[:top_k]
+    return [(int(c), int(n)) for c, n in zip(candidates[order], counts[order])]
+
+
+def build_suggestions(user_ids=None, top_k=TOP_K, batch_size=1000):
+    """Rebuild suggestion rows for ``user_ids`` (everyone when None)
+
+    Returns the number of users rebuilt.
+    """
+    friends, excluded = load_graphs()
+    if user_ids is None:
+        user_ids = User.objects.values_list('id', flat=True).iterator()
+
+    rebuilt = 0
+    batch = []
+    for user_id in user_ids:
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            rebuilt += _write(friends, excluded, batch, top_k)
+            batch = []
+    if batch:
+        rebuilt += _write(friends, excluded, batch, top_k)
+    return rebuilt
+
+
+def _write(friends, excluded, user_ids, top_k):
+    rows = []
+    for user_id in user_ids:
+        i = friends.index_of(user_id)
+        if i is None:
+            continue
+        rows.extend(
+            FriendSuggestion(user_id=user_id, suggested_id=int(friends.user_ids[c]), mutual_count=mutual)
+            for c, mutual in rank_candidates(friends, excluded, i, top_k)
+        )
+
+    with transaction.atomic():
+        FriendSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FriendSuggestion.objects.bulk_create(rows, batch_size=1000)
+    return len(user_ids)
+
+
+def build_stale_suggestions(top_k=TOP_K):
+    """Incremental build: only users whose 2-hop neighbourhood changed
+
+    A changed edge (a, b) alters the friends-of-friends of a, b and of
+    everyone adjacent to them, so the queued users are expanded by one hop
+    before ranking. Returns the number of users rebuilt.
+    """
+    started = timezone.now()
+    stale = list(SuggestionInvalidation.objects.filter(
+        created_at__lte=started
+    ).values_list('user_id', flat=True))
+    if not stale:
+        return 0
+
+    friends, excluded = load_graphs()
+    affected = set(stale)
+    for user_id in stale:
+        i = friends.index_of(user_id)
+        if i is not None:
+            affected.update(friends.user_ids[friends.neighbors(i)].tolist())
+
+    rebuilt = 0
+    affected = sorted(affected)
+    for start in range(0, len(affected), 1000):
+        rebuilt += _write(friends, excluded, affected[start:start + 1000], top_k)
+
+    SuggestionInvalidation.objects.filter(user_id__in=stale, created_at__lte=started).delete()
+    return rebuilt
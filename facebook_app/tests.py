@@ -1,3 +1,604 @@
-from django.test import TestCase
+import hashlib
+import random
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    Album, BlockedUser, Comment, CommentReaction, FeedEntry, Friendship, FriendSuggestion, Notification, Photo, Poll, PollOption, PollVote, Post, PostMedia,
+    PostReactionCount, Reaction, SavedPost, Story, StoryView, UploadSession, User, Video
+)
+from . import comments, deletion, feed, notifications, post_cards, reaction_buffer, reactions, suggestions, timeline
+from .privacy import set_audience
 
-# Create your tests here.
+
+class ReactionConcurrencyTests(TransactionTestCase):
+    """Many users reacting, switching and toggling off one post from parallel threads"""
+
+    USERS = 20
+    ROUNDS = 10
+    THREADS = 8
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'reactor{i}', password='pass', email=f'reactor{i}@example.com')
+            for i in range(self.USERS)
+        ]
+        self.post = Post.objects.create(author=self.users[0], content='Going viral', privacy='public')
+
+    def react(self, job):
+        user, reaction_type = job
+        try:
+            reactions.react(user, self.post.id, reaction_type)
+            return None
+        except OperationalError as e:
+            return e
+        finally:
+            close_old_connections()
+
+    def test_counters_match_rows_under_contention(self):
+        rng = random.Random(0)
+        types = list(reactions.REACTION_TYPES)
+        # Same-user clicks are interleaved too, like double clicks from two tabs
+        jobs = [(user, rng.choice(types)) for user in self.users for _ in range(self.ROUNDS)]
+        rng.shuffle(jobs)
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            errors = [error for error in pool.map(self.react, jobs) if error]
+
+        if connection.features.has_select_for_update:
+            self.assertEqual(errors, [])
+        actual = dict(Reaction.objects.filter(
+            post=self.post
+        ).order_by().values_list('reaction_type').annotate(total=Count('id')))
+        tallies = dict(PostReactionCount.objects.filter(
+            post=self.post
+        ).exclude(count=0).values_list('reaction_type', 'count'))
+        self.assertEqual(tallies, actual)
+        self.assertEqual(reactions.reaction_summaries([self.post.id])[self.post.id]['total'], sum(actual.values()))
+
+
+class ReactionBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.reactor = User.objects.create_user(username='reactor', password='pass', email='reactor@example.com')
+        self.post = Post.objects.create(author=self.author, content='Hello', privacy='public')
+        patcher = mock.patch.object(reaction_buffer, 'ENABLED', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_react_after_buffered_removal_adds_again(self):
+        reaction_buffer.react(self.reactor, self.post.id, 'like')
+        reaction_buffer.flush()
+        self.assertEqual(reaction_buffer.react(self.reactor, self.post.id, 'like'), ('removed', 'like'))
+        # The stored row is still there until the next flush
+        self.assertEqual(reaction_buffer.react(self.reactor, self.post.id, 'like'), ('added', None))
+
+        reaction_buffer.flush()
+        self.assertEqual(
+            list(Reaction.objects.filter(post=self.post).values_list('user_id', 'reaction_type')),
+            [(self.reactor.id, 'like')]
+        )
+
+    def test_failed_flush_is_retried(self):
+        reaction_buffer.react(self.reactor, self.post.id, 'wow')
+        failing = mock.patch.object(reactions, 'apply_states', side_effect=RuntimeError)
+        with failing, self.assertLogs(reaction_buffer.logger):
+            reaction_buffer.flush()
+        self.assertFalse(Reaction.objects.exists())
+        self.assertEqual(reaction_buffer.viewer_reactions(self.reactor.id, [self.post.id]), {self.post.id: 'wow'})
+
+        reaction_buffer.flush()
+        self.assertEqual(list(Reaction.objects.values_list('user_id', 'reaction_type')), [(self.reactor.id, 'wow')])
+
+    def test_viewer_sees_unflushed_reaction(self):
+        reaction_buffer.react(self.reactor, self.post.id, 'love')
+        self.assertFalse(Reaction.objects.exists())
+        self.assertEqual(reaction_buffer.viewer_reactions(self.reactor.id, [self.post.id]), {self.post.id: 'love'})
+
+
+class PhotoGridPrivacyTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass', email='owner@example.com')
+        self.stranger = User.objects.create_user(username='stranger', password='pass', email='stranger@example.com')
+        self.public_photo = Photo.objects.create(
+            user=self.owner,
+            album=Album.objects.create(user=self.owner, name='Trips', privacy='public'),
+            image='photos/public.jpg'
+        )
+        self.private_photo = Photo.objects.create(
+            user=self.owner,
+            album=Album.objects.create(user=self.owner, name='Mine', privacy='only_me'),
+            image='photos/private.jpg'
+        )
+
+    def test_grid_hides_photos_from_albums_the_viewer_cannot_see(self):
+        self.client.force_login(self.stranger)
+        response = self.client.get(reverse('profile_photos', args=[self.owner.username]))
+        self.assertEqual([photo['id'] for photo in response.json()['photos']], [self.public_photo.id])
+
+        response = self.client.get(reverse('profile', args=[self.owner.username]))
+        self.assertEqual([photo.id for photo in response.context['photos']], [self.public_photo.id])
+
+    def test_owner_sees_every_album(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('profile_photos', args=[self.owner.username]))
+        self.assertEqual(len(response.json()['photos']), 2)
+
+
+class ProfileCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='pass', email='owner@example.com')
+        self.visitor = User.objects.create_user(username='visitor', password='pass', email='visitor@example.com')
+        Post.objects.create(author=self.owner, content='Diary', privacy='only_me')
+
+    def test_post_and_photo_counts_are_shown_to_the_owner_only(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('profile', args=[self.owner.username]))
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertContains(response, '1 post')
+
+        self.client.force_login(self.visitor)
+        response = self.client.get(reverse('profile', args=[self.owner.username]))
+        self.assertIsNone(response.context['posts_count'])
+        self.assertIsNone(response.context['photos_count'])
+        self.assertNotContains(response, '1 post')
+
+
+class PostAudienceTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.friend = User.objects.create_user(username='friend', password='pass', email='friend@example.com')
+        self.stranger = User.objects.create_user(username='stranger', password='pass', email='stranger@example.com')
+        Friendship.objects.create(from_user=self.author, to_user=self.friend, status='accepted')
+        self.client.force_login(self.author)
+
+    def test_unknown_and_non_friend_ids_are_dropped(self):
+        self.client.post(reverse('create_post'), {
+            'content': 'Close friends only',
+            'privacy': 'specific_friends',
+            'audience_include': [self.friend.id, self.stranger.id, 999999],
+        })
+        post = Post.objects.get()
+        self.assertEqual(list(post.audience.values_list('user_id', flat=True)), [self.friend.id])
+
+
+class UploadInputTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader', password='pass', email='uploader@example.com')
+        self.client.force_login(self.user)
+
+    def test_non_numeric_size_is_rejected(self):
+        response = self.client.post(reverse('upload_start'), {'target': 'video', 'filename': 'a.mp4', 'size': 'big'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid upload size'})
+
+    def test_non_numeric_post_id_is_rejected(self):
+        session = UploadSession.objects.create(user=self.user, target='post_media', filename='a.jpg', total_size=1)
+        response = self.client.post(reverse('upload_complete', args=[session.id]), {'post_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid post id'})
+
+    def _chunk(self, session, data, offset=0, **extra):
+        return self.client.post(
+            reverse('upload_chunk', args=[session['id']]), data, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=hashlib.sha256(data).hexdigest(), **extra
+        )
+
+    def test_chunked_video_upload(self):
+        session = self.client.post(
+            reverse('upload_start'), {'target': 'video', 'filename': 'clip.mp4', 'size': 6}
+        ).json()
+        self.assertEqual(self._chunk(session, b'abc').json()['offset'], 3)
+        response = self._chunk(session, b'abc')
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 3))
+        response = self._chunk(session, b'def', offset=3, CONTENT_LENGTH='3x')
+        self.assertEqual(response.json(), {'error': 'Invalid Content-Length header'})
+        self.assertEqual(self._chunk(session, b'def', offset=3).json()['offset'], 6)
+
+        complete = reverse('upload_complete', args=[session['id']])
+        response = self.client.post(complete, {'title': 'Clip', 'privacy': 'x' * 50})
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Unknown privacy setting'}))
+        response = self.client.post(complete, {'title': 'Clip', 'privacy': 'friends'})
+        video = Video.objects.get(id=response.json()['id'])
+        self.assertEqual(video.privacy, 'friends')
+        with video.video_file.open('rb') as f:
+            self.assertEqual(f.read(), b'abcdef')
+
+
+class SharedOriginalTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.friend = User.objects.create_user(username='friend', password='pass', email='friend@example.com')
+        self.stranger = User.objects.create_user(username='stranger', password='pass', email='stranger@example.com')
+        Friendship.objects.create(from_user=self.author, to_user=self.friend, status='accepted')
+        cache.clear()
+
+    def _share(self, privacy):
+        original = Post.objects.create(author=self.author, content=f'Original for {privacy}', privacy=privacy)
+        return Post.objects.create(
+            author=self.friend, post_type='shared', shared_post=original, privacy='public'
+        ), original
+
+    def test_public_original_is_rendered(self):
+        share, original = self._share('public')
+        [card] = post_cards.render_cards(self.stranger, [share.id])
+        self.assertIn(original.content, card.html)
+
+    def test_limited_original_is_rendered_per_viewer(self):
+        share, original = self._share('friends')
+        for viewer in (self.friend, self.author):
+            [card] = post_cards.render_cards(viewer, [share.id])
+            self.assertIn(original.content, card.html)
+
+        # The friend's cached card must not be served to a stranger
+        [card] = post_cards.render_cards(self.stranger, [share.id])
+        self.assertNotIn(original.content, card.html)
+        self.assertIn("This content isn't available right now", card.html)
+
+
+class PostVisibilityMatrixTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.friend = User.objects.create_user(username='friend', password='pass', email='friend@example.com')
+        self.left_out = User.objects.create_user(username='leftout', password='pass', email='leftout@example.com')
+        self.stranger = User.objects.create_user(username='stranger', password='pass', email='stranger@example.com')
+        for user in (self.friend, self.left_out):
+            Friendship.objects.create(from_user=self.author, to_user=user, status='accepted')
+
+        audiences = {
+            'friends_except': ([], [self.left_out.id]),
+            'specific_friends': ([self.friend.id], []),
+            'custom': ([self.friend.id, self.stranger.id], [self.left_out.id]),
+        }
+        self.posts = {}
+        for mode, _ in Post.PRIVACY_CHOICES:
+            post = Post.objects.create(author=self.author, content=f'matrix {mode}', privacy=mode)
+            set_audience(post, *audiences.get(mode, ([], [])))
+            self.posts[mode] = post
+
+    def _expected(self, viewer):
+        modes = {
+            self.author: {'public', 'friends', 'friends_except', 'specific_friends', 'custom', 'only_me'},
+            self.friend: {'public', 'friends', 'friends_except', 'specific_friends', 'custom'},
+            self.left_out: {'public', 'friends'},
+            self.stranger: {'public', 'custom'},
+        }[viewer]
+        return {self.posts[mode].id for mode in modes}
+
+    def test_each_privacy_mode_on_every_read_path(self):
+        for viewer in (self.author, self.friend, self.left_out, self.stranger):
+            with self.subTest(viewer=viewer.username):
+                expected = self._expected(viewer)
+                # Only the author and their friends get the posts fanned out to them
+                in_feed = expected if viewer != self.stranger else set()
+                self.assertEqual(set(feed.feed_page(viewer)[0]), in_feed)
+                self.assertEqual({post.id for post in timeline.timeline_page(viewer, self.author)[0]}, expected)
+
+                self.client.force_login(viewer)
+                response = self.client.get(reverse('search'), {'q': 'matrix'})
+                self.assertEqual({post.id for post in response.context['posts']}, expected)
+                for post in self.posts.values():
+                    status = self.client.get(reverse('post_detail', args=[post.id])).status_code
+                    self.assertEqual(status, 200 if post.id in expected else 404, post.privacy)
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.viewer = User.objects.create_user(username='viewer', password='pass', email='viewer@example.com')
+        self.troll = User.objects.create_user(username='troll', password='pass', email='troll@example.com')
+        self.post = Post.objects.create(author=self.author, content='Cached', privacy='public')
+        Comment.objects.create(post=self.post, author=self.troll, content='Troll comment')
+
+    def _feed_cards(self, viewer):
+        self.client.force_login(viewer)
+        FeedEntry.objects.get_or_create(
+            viewer=viewer, post=self.post, defaults={'author': self.author, 'created_at': self.post.created_at}
+        )
+        return self.client.get(reverse('newsfeed')).context['post_cards']
+
+    def test_repeat_render_hits_and_changes_miss(self):
+        post_cards.render_cards(self.viewer, [self.post.id])
+        post_cards.render_cards(self.viewer, [self.post.id])
+        self.assertEqual(post_cards.cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+        # A reaction changes the tallies and the viewer's own reaction, so both keys move
+        reactions.react(self.viewer, self.post.id, 'like')
+        post_cards.render_cards(self.viewer, [self.post.id])
+        post_cards.render_cards(self.author, [self.post.id])
+        self.assertEqual(post_cards.cache_stats()['misses'], 3)
+
+    def test_preview_comments_by_blocked_users_are_hidden(self):
+        bystander = User.objects.create_user(username='bystander', password='pass', email='bystander@example.com')
+        [card] = self._feed_cards(bystander)
+        self.assertIn('Troll comment', card.html)
+
+        # Same reaction state and not the author: only the block set tells the keys apart
+        BlockedUser.objects.create(blocker=self.viewer, blocked=self.troll)
+        [card] = self._feed_cards(self.viewer)
+        self.assertNotIn('Troll comment', card.html)
+
+
+class NewsfeedPollingTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username='viewer', password='pass', email='viewer@example.com')
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.client.force_login(self.viewer)
+
+    def test_polling_starts_from_the_rendered_head(self):
+        post = Post.objects.create(author=self.author, content='Hello', privacy='public')
+        FeedEntry.objects.create(viewer=self.viewer, post=post, author=self.author, created_at=post.created_at)
+        response = self.client.get(reverse('newsfeed'))
+        head_cursor = feed.encode_cursor(post.created_at, post.id)
+        self.assertEqual(response.context['head_cursor'], head_cursor)
+        self.assertContains(response, f'let sinceCursor = "{head_cursor}"')
+
+
+class ReplyDepthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='commenter', password='pass', email='commenter@example.com')
+        self.post = Post.objects.create(author=self.user, content='Thread', privacy='public')
+        self.top = Comment.objects.create(post=self.post, author=self.user, content='Top')
+        self.client.force_login(self.user)
+
+    def _reply(self, parent_id):
+        return self.client.post(
+            reverse('comment_on_post', args=[self.post.id]), {'content': 'Reply', 'parent_comment_id': parent_id}
+        )
+
+    def test_reply_to_a_reply_is_filed_under_the_top_level_comment(self):
+        self._reply(self.top.id)
+        reply = Comment.objects.get(parent_comment=self.top)
+        self._reply(reply.id)
+
+        self.assertFalse(Comment.objects.filter(parent_comment=reply).exists())
+        [top], _ = comments.comment_thread(self.user, self.post.id)
+        self.assertEqual(top.reply_count, 2)
+        replies, _ = comments.reply_page(self.user, self.top.id)
+        self.assertEqual(len(replies), 2)
+
+    def test_reply_to_a_comment_on_another_post_is_rejected(self):
+        other = Post.objects.create(author=self.user, content='Elsewhere', privacy='public')
+        foreign = Comment.objects.create(post=other, author=self.user, content='Foreign')
+        self.assertEqual(self._reply(foreign.id).status_code, 404)
+        self.assertEqual(self._reply('abc').status_code, 404)
+
+    def test_migration_lifts_deeply_nested_replies_to_the_top_level_comment(self):
+        flatten = import_module('facebook_app.migrations.0018_flatten_comment_replies')
+        reply = Comment.objects.create(post=self.post, author=self.user, content='Reply', parent_comment=self.top)
+        nested = Comment.objects.create(post=self.post, author=self.user, content='Nested', parent_comment=reply)
+        deeper = Comment.objects.create(post=self.post, author=self.user, content='Deeper', parent_comment=nested)
+
+        flatten.flatten_replies(django_apps, None)
+
+        self.assertEqual(
+            set(Comment.objects.filter(parent_comment=self.top).values_list('id', flat=True)),
+            {reply.id, nested.id, deeper.id}
+        )
+        self.assertIsNone(Comment.objects.get(id=self.top.id).parent_comment_id)
+
+
+class FeedFanOutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.friend = User.objects.create_user(username='friend', password='pass', email='friend@example.com')
+        self.stranger = User.objects.create_user(username='stranger', password='pass', email='stranger@example.com')
+        self.friendship = Friendship.objects.create(from_user=self.author, to_user=self.friend, status='accepted')
+
+    def _viewers(self, post):
+        return set(FeedEntry.objects.filter(post=post).values_list('viewer_id', flat=True))
+
+    def test_new_post_fans_out_to_author_and_friends(self):
+        post = Post.objects.create(author=self.author, content='Hi', privacy='friends')
+        self.assertEqual(self._viewers(post), {self.author.id, self.friend.id})
+
+    def test_only_me_post_stays_with_the_author(self):
+        post = Post.objects.create(author=self.author, content='Diary', privacy='only_me')
+        self.assertEqual(self._viewers(post), {self.author.id})
+
+    def test_archive_removes_and_unarchive_restores(self):
+        post = Post.objects.create(author=self.author, content='Hi', privacy='friends')
+        post.is_archived = True
+        post.save(update_fields=['is_archived'])
+        self.assertEqual(self._viewers(post), set())
+
+        post.is_archived = False
+        post.save(update_fields=['is_archived'])
+        self.assertEqual(self._viewers(post), {self.author.id, self.friend.id})
+
+    def test_accept_backfills_both_feeds(self):
+        theirs = Post.objects.create(author=self.stranger, content='Before we met', privacy='friends')
+        mine = Post.objects.create(author=self.author, content='Also before', privacy='friends')
+        friendship = Friendship.objects.create(from_user=self.stranger, to_user=self.author, status='pending')
+        self.assertEqual(self._viewers(theirs), {self.stranger.id})
+
+        friendship.status = 'accepted'
+        friendship.save()
+        self.assertEqual(self._viewers(theirs), {self.stranger.id, self.author.id})
+        self.assertIn(self.stranger.id, self._viewers(mine))
+
+    def test_unfriend_removes_each_others_posts(self):
+        post = Post.objects.create(author=self.author, content='Hi', privacy='friends')
+        self.friendship.delete()
+        self.assertEqual(self._viewers(post), {self.author.id})
+        self.assertEqual(feed.feed_page(self.friend)[0], [])
+
+    def test_large_audience_posts_are_pulled_and_merged(self):
+        fanned_out = Post.objects.create(author=self.author, content='Before', privacy='friends')
+        with mock.patch.object(feed, 'FANOUT_LIMIT', 0):
+            pulled = Post.objects.create(author=self.author, content='After', privacy='friends')
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.large_audience)
+        self.assertEqual(self._viewers(pulled), {self.author.id})
+
+        # The fanned-out post is also found by the pull path but appears once
+        self.assertEqual(feed.feed_page(self.friend)[0], [pulled.id, fanned_out.id])
+        self.assertEqual(feed.feed_page(self.stranger)[0], [])
+
+
+class PurgeDeletedPostsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass', email='author@example.com')
+        self.other = User.objects.create_user(username='other', password='pass', email='other@example.com')
+
+    def test_purge_removes_every_dependent_row_and_file(self):
+        post = Post.objects.create(author=self.author, content='Going away', privacy='public')
+        post.tagged_users.add(self.other)
+        share = Post.objects.create(author=self.other, post_type='shared', shared_post=post, privacy='public')
+
+        media = PostMedia(post=post, media_type='image')
+        media.file.save('purge.jpg', ContentFile(b'jpeg'), save=True)
+        top = Comment.objects.create(post=post, author=self.other, content='Top')
+        reply = Comment.objects.create(post=post, author=self.author, content='Reply', parent_comment=top)
+        nested = Comment.objects.create(post=post, author=self.other, content='Nested', parent_comment=reply)
+        nested.image.save('purge.png', ContentFile(b'png'), save=True)
+        nested.tagged_users.add(self.author)
+        CommentReaction.objects.create(user=self.author, comment=nested, reaction_type='like')
+        Reaction.objects.create(user=self.other, post=post, reaction_type='love')
+        PostReactionCount.objects.create(post=post, reaction_type='love', count=1)
+        SavedPost.objects.create(user=self.other, post=post)
+        poll = Poll.objects.create(post=post, question='Yes?', expires_at=timezone.now() + timedelta(days=1))
+        option = PollOption.objects.create(poll=poll, text='Yes')
+        PollVote.objects.create(poll=poll, option=option, voter=self.other)
+        files = [(media.file.storage, media.file.name), (nested.image.storage, nested.image.name)]
+        self.assertTrue(all(storage.exists(name) for storage, name in files))
+
+        deletion.soft_delete_post(post)
+        call_command('purge_deleted_posts', stdout=StringIO())
+
+        self.assertFalse(Post.objects.filter(id=post.id).exists())
+        for model in (PostMedia, Reaction, PostReactionCount, SavedPost, Poll, FeedEntry):
+            self.assertFalse(model.objects.filter(post_id=post.id).exists(), model.__name__)
+        self.assertFalse(Comment.objects.filter(id__in=[top.id, reply.id, nested.id]).exists())
+        self.assertFalse(CommentReaction.objects.exists())
+        self.assertFalse(PollOption.objects.exists() or PollVote.objects.exists())
+        self.assertFalse(Post.tagged_users.through.objects.filter(post_id=post.id).exists())
+        self.assertFalse(Comment.tagged_users.through.objects.exists())
+        for storage, name in files:
+            self.assertFalse(storage.exists(name), name)
+
+        share.refresh_from_db()
+        self.assertIsNone(share.shared_post_id)
+
+
+class PurgeExpiredStoriesTests(TestCase):
+    def test_expired_stories_and_their_views_are_deleted(self):
+        user = User.objects.create_user(username='storyteller', password='pass', email='storyteller@example.com')
+        now = timezone.now()
+        expired = Story.objects.create(user=user, story_type='text', expires_at=now - timedelta(minutes=1))
+        live = Story.objects.create(user=user, story_type='text', expires_at=now + timedelta(hours=1))
+        for story in (expired, live):
+            StoryView.objects.create(story=story, viewer=user)
+
+        call_command('purge_expired_stories', stdout=StringIO())
+
+        self.assertEqual(list(Story.objects.values_list('id', flat=True)), [live.id])
+        self.assertEqual(list(StoryView.objects.values_list('story_id', flat=True)), [live.id])
+
+
+class FriendSuggestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = {
+            name: User.objects.create_user(username=name, password='pass', email=f'{name}@example.com')
+            for name in ('ann', 'bob', 'cat', 'dan', 'eve')
+        }
+
+    def _befriend(self, a, b, status='accepted'):
+        return Friendship.objects.create(from_user=self.users[a], to_user=self.users[b], status=status)
+
+    def test_rank_candidates_orders_by_mutual_count_and_skips_excluded(self):
+        # ann - bob, ann - cat, bob - dan, cat - dan, bob - eve; ann has asked eve
+        friends = suggestions.CSRGraph([1, 2, 3, 4, 5], [(1, 2), (1, 3), (2, 4), (3, 4), (2, 5)])
+        excluded = suggestions.CSRGraph([1, 2, 3, 4, 5], [(1, 5)])
+        self.assertEqual(suggestions.rank_candidates(friends, excluded, 0), [(3, 2)])
+
+        no_exclusions = suggestions.CSRGraph([1, 2, 3, 4, 5], [])
+        self.assertEqual(suggestions.rank_candidates(friends, no_exclusions, 0), [(3, 2), (4, 1)])
+
+    def test_build_stale_suggestions(self):
+        for a, b in (('ann', 'bob'), ('ann', 'cat'), ('bob', 'dan'), ('cat', 'dan'), ('bob', 'eve')):
+            self._befriend(a, b)
+        self._befriend('ann', 'eve', status='pending')
+
+        self.assertEqual(suggestions.build_stale_suggestions(), 5)
+        rows = FriendSuggestion.objects.filter(user=self.users['ann']).values_list('suggested__username', 'mutual_count')
+        self.assertEqual(list(rows), [('dan', 2)])
+        self.assertEqual(suggestions.build_stale_suggestions(), 0)
+
+    def test_new_requests_hide_precomputed_suggestions(self):
+        ann = self.users['ann']
+        for name, mutual in (('dan', 2), ('eve', 1)):
+            FriendSuggestion.objects.create(user=ann, suggested=self.users[name], mutual_count=mutual)
+        self._befriend('ann', 'dan', status='pending')
+
+        self.client.force_login(ann)
+        response = self.client.get(reverse('newsfeed'))
+        self.assertEqual([user.username for user in response.context['friend_suggestions']], ['eve'])
+
+
+class NotificationAggregationTests(TestCase):
+    def setUp(self):
+        self.recipient = User.objects.create_user(
+            username='recipient', password='pass', email='recipient@example.com', first_name='Rae', last_name='Cipient'
+        )
+        self.actors = [
+            User.objects.create_user(
+                username=f'actor{i}', password='pass', email=f'actor{i}@example.com', first_name=f'Actor{i}', last_name='X'
+            )
+            for i in range(3)
+        ]
+
+    def _comment(self, actor, target_key='post:1'):
+        return notifications.notify(
+            self.recipient, actor, 'post_comment', 'commented on your post', title='New comment', target_key=target_key
+        )
+
+    def test_actors_aggregate_into_one_row(self):
+        for actor in self.actors:
+            self._comment(actor)
+        # A repeat actor moves to the front without being counted again
+        notification = self._comment(self.actors[0])
+
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.message, 'Actor0 X and 2 others commented on your post')
+        self.assertEqual(notification.latest_actor_ids, [self.actors[0].id, self.actors[2].id, self.actors[1].id])
+
+        self._comment(self.actors[1], target_key='post:2')
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertIsNone(self._comment(self.recipient))
+
+    def test_expired_window_starts_a_new_row(self):
+        first = self._comment(self.actors[0])
+        Notification.objects.filter(id=first.id).update(created_at=timezone.now() - notifications.WINDOW - timedelta(minutes=1))
+
+        second = self._comment(self.actors[1])
+        self.assertNotEqual(first.id, second.id)
+        self.assertEqual(second.actor_count, 1)
+        self.assertEqual(second.message, 'Actor1 X commented on your post')
+
+    def test_friend_requests_keep_one_row_per_requester(self):
+        for actor in self.actors[:2]:
+            self.client.force_login(actor)
+            self.client.post(reverse('send_friend_request', args=[self.recipient.id]))
+
+        rows = Notification.objects.filter(recipient=self.recipient, notification_type='friend_request')
+        self.assertEqual(sorted(rows.values_list('sender_id', flat=True)), [self.actors[0].id, self.actors[1].id])
+        self.assertTrue(all(row.link.endswith(reverse('friends')) for row in rows))
@@ -0,0 +1,104 @@
+"""
+timeline.py
+Keyset-paginated profile timelines (pinned posts first) and photo grids
+
+Timeline pages walk the (author, is_pinned, created_at, id) index and grid
+pages the (user or album, created_at, id) one, so page 500 of a long-lived
+account costs the same as page 1.
+"""
+
+from django.conf import settings
+from django.db.models import Q
+from .models import Photo, Post
+from .feed import decode_cursor, encode_cursor, older_than
+from .privacy import visible_posts
+from . import friend_graph
+
+
+PAGE_SIZE = getattr(settings, 'TIMELINE_PAGE_SIZE', 20)
+
+PHOTO_PAGE_SIZE = getattr(settings, 'PHOTO_GRID_PAGE_SIZE', 24)
+
+
+# ==================== CURSORS ====================
+
+def encode_timeline_cursor(is_pinned, created_at, post_id):
+    """Feed cursor prefixed with the pinned flag: '1...' or '0...'"""
+    return f'{int(is_pinned)}{encode_cursor(created_at, post_id)}'
+
+
+def decode_timeline_cursor(cursor):
+    """Inverse of encode_timeline_cursor; raises ValueError on a malformed cursor"""
+    if not cursor or cursor[0] not in '01':
+        raise ValueError('Invalid cursor')
+    return (cursor[0] == '1', *decode_cursor(cursor[1:]))
+
+
+def _after_timeline(cursor):
+    """Rows after the cursor in (is_pinned, created_at, id) descending order"""
+    is_pinned, created_at, post_id = cursor
+    later = Q(is_pinned=is_pinned) & older_than((created_at, post_id), 'created_at', 'id')
+    if is_pinned:
+        # Every unpinned post comes after the last pinned one
+        return later | Q(is_pinned=False)
+    return later
+
+
+# ==================== READERS ====================
+
+def timeline_page(viewer, profile_user, cursor=None, queryset=None, limit=PAGE_SIZE):
+    """One page of a profile's posts visible to the viewer: (posts, next_cursor)"""
+    if isinstance(cursor, str):
+        cursor = decode_timeline_cursor(cursor)
+    if queryset is None:
+        queryset = Post.objects.all()
+
+    posts = visible_posts(queryset.filter(author=profile_user, is_archived=False), viewer)
+    if cursor:
+        posts = posts.filter(_after_timeline(cursor))
+    posts = list(posts.order_by('-is_pinned', '-created_at', '-id')[:limit + 1])
+
+    next_cursor = None
+    if len(posts) > limit:
+        last = posts[limit - 1]
+        next_cursor = encode_timeline_cursor(last.is_pinned, last.created_at, last.id)
+    return posts[:limit], next_cursor
+
+
+def _album_privacies(viewer, owner):
+    """Album privacy levels the viewer may see on the owner's profile, or None for all"""
+    if viewer.id == owner.id:
+        return None
+    if friend_graph.are_friends(viewer.id, owner.id):
+        return ['public', 'friends']
+    return ['public']
+
+
+def can_view_album(viewer, album):
+    privacies = _album_privacies(viewer, album.user)
+    return privacies is None or album.privacy in privacies
+
+
+def photo_page(viewer, user, cursor=None, album=None, limit=PHOTO_PAGE_SIZE):
+    """One page of a user's photos the viewer may see, or of one album, newest first: (photos, next_cursor)
+
+    Photos outside any album are as visible as the profile itself; album
+    photos follow the album's privacy. Callers check ``album`` with
+    can_view_album first.
+    """
+    if isinstance(cursor, str):
+        cursor = decode_cursor(cursor)
+
+    if album is not None:
+        photos = Photo.objects.filter(album=album)
+    else:
+        photos = Photo.objects.filter(user=user)
+        privacies = _album_privacies(viewer, user)
+        if privacies is not None:
+            photos = photos.filter(Q(album__isnull=True) | Q(album__privacy__in=privacies))
+    if cursor:
+        photos = photos.filter(older_than(cursor, 'created_at', 'id'))
+    photos = list(photos.order_by('-created_at', '-id')[:limit + 1])
+
+    next_cursor = encode_cursor(photos[limit - 1].created_at, photos[limit - 1].id) if len(photos) > limit else None
+    return photos[:limit], next_cursor
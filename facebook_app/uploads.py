@@ -0,0 +1,220 @@
+"""
+uploads.py
+Chunked, resumable uploads for post media and Watch videos
+
+A client opens an UploadSession, then sends the file as sequential raw
+chunks, each tagged with its byte offset and SHA-256. Chunks are streamed
+to disk in small blocks and then appended to a part file, so no request
+ever holds a whole file in memory. A dropped connection resumes from the
+session's ``received`` offset. Completing the session moves the part file into
+storage (a rename on the same filesystem) and creates the target row in
+the same transaction.
+"""
+
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Post, PostMedia, UploadSession, Video
+from . import media
+
+
+# Largest chunk accepted in one request
+CHUNK_SIZE = getattr(settings, 'UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+
+MAX_UPLOAD_SIZE = getattr(settings, 'UPLOAD_MAX_SIZE', 4 * 1024 * 1024 * 1024)
+
+# Part files live next to MEDIA_ROOT so assembly is a rename, not a copy
+SESSION_DIR = getattr(settings, 'UPLOAD_SESSION_DIR', os.path.join(settings.MEDIA_ROOT, 'upload_sessions'))
+
+READ_BLOCK = 64 * 1024
+
+
+class OffsetMismatch(ValueError):
+    """A chunk arrived for an offset other than the session's resume point"""
+
+    def __init__(self, expected):
+        super().__init__(f'Expected offset {expected}')
+        self.expected = expected
+
+
+class _PartFile(File):
+    """A finished part file; FileSystemStorage moves it into place instead of copying"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def part_path(session):
+    return os.path.join(SESSION_DIR, f'{session.id}.part')
+
+
+# ==================== SESSIONS ====================
+
+def start_session(user, target, filename, total_size, content_type='', checksum=''):
+    """Open an upload session and its empty part file"""
+    if target not in dict(UploadSession.TARGET_CHOICES):
+        raise ValueError('Unknown upload target')
+    if not 0 < total_size <= MAX_UPLOAD_SIZE:
+        raise ValueError('Invalid upload size')
+
+    session = UploadSession.objects.create(
+        user=user,
+        target=target,
+        filename=os.path.basename(filename)[:255] or 'upload',
+        content_type=content_type[:100],
+        total_size=total_size,
+        checksum=checksum.lower(),
+    )
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def write_chunk(session, offset, stream, length, checksum):
+    """Append one chunk read from ``stream`` at ``offset``; returns the new offset
+
+    The chunk is read off the socket into its own spool file and verified
+    before any lock is taken. Only then is the session row locked, briefly,
+    to recheck the offset, copy the spooled bytes into the part file and
+    advance ``received``; two retries of the same chunk cannot interleave.
+    A chunk whose length or SHA-256 does not match leaves the offset
+    unchanged.
+    """
+    if length > CHUNK_SIZE:
+        raise ValueError(f'Chunks are limited to {CHUNK_SIZE} bytes')
+    _check_offset(session, offset, length)
+
+    spool_path = f'{part_path(session)}.{uuid.uuid4().hex}'
+    try:
+        digest = hashlib.sha256()
+        written = 0
+        with open(spool_path, 'w+b') as spool:
+            while written < length:
+                block = stream.read(min(READ_BLOCK, length - written))
+                if not block:
+                    break
+                digest.update(block)
+                spool.write(block)
+                written += len(block)
+            if written != length or digest.hexdigest() != checksum.lower():
+                raise ValueError('Chunk checksum or length mismatch')
+
+            with transaction.atomic():
+                session = UploadSession.objects.select_for_update().get(id=session.id)
+                _check_offset(session, offset, length)
+                spool.seek(0)
+                with open(part_path(session), 'r+b') as part:
+                    part.seek(offset)
+                    shutil.copyfileobj(spool, part, READ_BLOCK)
+                    part.flush()
+                    os.fsync(part.fileno())
+                session.received = offset + length
+                session.save(update_fields=['received', 'updated_at'])
+    finally:
+        os.remove(spool_path)
+    return session.received
+
+
+def _check_offset(session, offset, length):
+    if session.status != 'active':
+        raise ValueError('Upload is not active')
+    if offset != session.received:
+        raise OffsetMismatch(session.received)
+    if offset + length > session.total_size:
+        raise ValueError('Chunk runs past the end of the file')
+
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_session(session, post=None, title='', description='', privacy='public'):
+    """Assemble a fully received upload into its target; returns the PostMedia or Video
+
+    ``post`` is required for post media; ``title`` for videos.
+    """
+    if session.status != 'active' or session.received != session.total_size:
+        raise ValueError('Upload is not complete')
+    path = part_path(session)
+    if session.checksum and _file_checksum(path) != session.checksum:
+        raise ValueError('File checksum mismatch')
+
+    if session.target == 'post_media':
+        if post is None or post.author_id != session.user_id:
+            raise ValueError('A post of your own is required')
+        target = PostMedia(
+            post=post,
+            media_type='video' if session.content_type.startswith('video/') else 'image',
+            order=post.media_count
+        )
+        field = target.file
+    else:
+        if not title:
+            raise ValueError('A title is required')
+        if privacy not in dict(Video.PRIVACY_CHOICES):
+            raise ValueError('Unknown privacy setting')
+        target = Video(
+            uploader_id=session.user_id,
+            title=title[:200],
+            description=description,
+            privacy=privacy,
+            duration=0
+        )
+        field = target.video_file
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session.id)
+        if session.status != 'active':
+            raise ValueError('Upload is not active')
+        with open(path, 'rb') as part:
+            field.save(session.filename, _PartFile(part), save=False)
+        target.save()
+        if session.target == 'post_media':
+            Post.objects.filter(id=post.id).update(
+                media_count=F('media_count') + 1,
+                version=F('version') + 1
+            )
+            media.enqueue([target.id])
+        session.status = 'complete'
+        session.save(update_fields=['status', 'updated_at'])
+    # Only still there when the storage backend copied instead of moving
+    _remove_part(session)
+    return target
+
+
+def abort_session(session):
+    """Give up on an upload and drop its part file"""
+    UploadSession.objects.filter(id=session.id, status='active').update(
+        status='aborted',
+        updated_at=timezone.now()
+    )
+    _remove_part(session)
+
+
+def _remove_part(session):
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def expire_sessions(max_age=timedelta(days=1)):
+    """Abort uploads that have not received a chunk within ``max_age``; returns how many"""
+    stale = list(UploadSession.objects.filter(
+        status='active',
+        updated_at__lt=timezone.now() - max_age
+    ))
+    for session in stale:
+        abort_session(session)
+    return len(stale)
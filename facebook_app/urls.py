@@ -9,7 +9,13 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('', views.newsfeed_view, name='newsfeed'),
     path('newsfeed/', views.newsfeed_view, name='newsfeed'),
+    path('newsfeed/page/', views.newsfeed_page_view, name='newsfeed_page'),
+    path('newsfeed/new/', views.newsfeed_new_view, name='newsfeed_new'),
+    path('newsfeed/async/', views.newsfeed_async_view, name='newsfeed_async'),
     path('profile/<str:username>/', views.profile_view, name='profile'),
+    path('profile/<str:username>/async/', views.profile_async_view, name='profile_async'),
+    path('profile/<str:username>/posts/', views.profile_posts_view, name='profile_posts'),
+    path('profile/<str:username>/photos/', views.profile_photos_view, name='profile_photos'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'),
     
     # ==================== POSTS ====================
@@ -18,11 +24,20 @@ urlpatterns = [
     path('post/<int:post_id>/delete/', views.delete_post_view, name='delete_post'),
     path('post/<int:post_id>/react/', views.react_to_post_view, name='react_to_post'),
     path('post/<int:post_id>/comment/', views.comment_on_post_view, name='comment_on_post'),
+    path('post/<int:post_id>/comments/', views.post_comments_view, name='post_comments'),
+    path('comment/<int:comment_id>/replies/', views.comment_replies_view, name='comment_replies'),
     path('friends/', views.friends_view, name='friends'),
     path('friends/request/<int:user_id>/', views.send_friend_request_view, name='send_friend_request'),
     path('friends/accept/<int:friendship_id>/', views.accept_friend_request_view, name='accept_friend_request'),
     path('friends/unfriend/<int:user_id>/', views.unfriend_view, name='unfriend'),
     
+    # ==================== UPLOADS ====================
+    path('uploads/', views.upload_start_view, name='upload_start'),
+    path('uploads/<uuid:session_id>/', views.upload_status_view, name='upload_status'),
+    path('uploads/<uuid:session_id>/chunk/', views.upload_chunk_view, name='upload_chunk'),
+    path('uploads/<uuid:session_id>/complete/', views.upload_complete_view, name='upload_complete'),
+    path('uploads/<uuid:session_id>/abort/', views.upload_abort_view, name='upload_abort'),
+    
     # ==================== MESSENGER ====================
     path('messenger/', views.messenger_view, name='messenger'),
     path('messenger/<int:conversation_id>/', views.conversation_view, name='conversation'),
@@ -3,16 +3,24 @@ views.py
 Complete views for Facebook-like application
 """
 
+import asyncio
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.db.models import Q, Count, Prefetch
-from django.http import JsonResponse
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, Count, Prefetch
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 from django.utils import timezone
 from datetime import timedelta
 from .models import *
+from . import blocks, comments, deletion, feed, friend_graph, media, notifications, post_cards, profiles, reaction_buffer, reactions, relationships, timeline, uploads
+from .privacy import set_audience, visible_posts
+from .stories import stories_tray
 
 
 # ==================== AUTHENTICATION ====================
@@ -106,34 +114,16 @@ def logout_view(request):
 def newsfeed_view(request):
     """Main newsfeed"""
     # Get friends
-    friends = User.objects.filter(
-        Q(friendships_received__from_user=request.user, friendships_received__status='accepted') |
-        Q(friendships_sent__to_user=request.user, friendships_sent__status='accepted')
-    ).distinct()
-    
-    # Get posts from friends and self
-    posts = Post.objects.filter(
-        Q(author=request.user) | Q(author__in=friends),
-        is_archived=False
-    ).select_related('author').prefetch_related(
-        'reactions', 'comments', 'media', 'tagged_users'
-    ).order_by('-created_at')[:50]
-    
-    # Get stories
-    stories = Story.objects.filter(
-        Q(user=request.user) | Q(user__in=friends),
-        expires_at__gt=timezone.now()
-    ).select_related('user').order_by('-created_at')
-    
-    # Friend suggestions
-    friend_suggestions = User.objects.exclude(
-        Q(id=request.user.id) |
-        Q(friendships_received__from_user=request.user) |
-        Q(friendships_sent__to_user=request.user)
-    )[:10]
+    friend_ids = friend_graph.friend_ids(request.user.id)
+    
+    cards, next_cursor, head_cursor = _newsfeed_cards(request.user)
+    stories = stories_tray(request.user, friend_ids)
+    friend_suggestions = _friend_suggestions(request.user, friend_ids)
     
     context = {
-        'posts': posts,
+        'post_cards': cards,
+        'next_cursor': next_cursor,
+        'head_cursor': head_cursor,
         'stories': stories,
         'friend_suggestions': friend_suggestions,
     }
@@ -141,55 +131,242 @@ def newsfeed_view(request):
     return render(request, 'newsfeed.html', context)
 
 
+@login_required
+def newsfeed_page_view(request):
+    """Next page of the newsfeed for infinite scroll (JSON with an HTML fragment)"""
+    try:
+        post_ids, next_cursor = feed.feed_page(request.user, cursor=request.GET.get('cursor') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    cards = post_cards.render_cards(request.user, post_ids, _feed_post_queryset(request.user))
+    
+    html = render_to_string('partials/feed_posts.html', {'post_cards': cards}, request=request)
+    
+    return JsonResponse({
+        'html': html,
+        'post_ids': [card.post_id for card in cards],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def newsfeed_new_view(request):
+    """Count and ids of feed posts newer than the ``since`` cursor, for polling"""
+    try:
+        post_ids, has_more, cursor = feed.new_since(request.user, request.GET.get('since') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    return JsonResponse({
+        'count': len(post_ids),
+        'has_more': has_more,
+        'post_ids': post_ids,
+        'cursor': cursor,
+    })
+
+
+def _feed_post_queryset(viewer):
+    """Posts with everything a feed card renders for ``viewer``"""
+    return Post.objects.select_related('author').prefetch_related(
+        comments.comment_preview_prefetch(viewer), 'media', 'tagged_users'
+    )
+
+
+def _newsfeed_cards(user):
+    """First page of the materialized feed as rendered post cards: (cards, next_cursor, head_cursor)
+
+    The head cursor is read before the page so polling for new posts
+    starts no later than the newest post rendered.
+    """
+    head_cursor = feed.new_since(user)[2]
+    post_ids, next_cursor = feed.feed_page(user)
+    return post_cards.render_cards(user, post_ids, _feed_post_queryset(user)), next_cursor, head_cursor
+
+
+def _friend_suggestions(user, friend_ids):
+    """Friend suggestions, precomputed by build_friend_suggestions"""
+    # Rows are only rebuilt periodically, so skip friends and anyone with a
+    # pending/declined request made since, as well as blocked users
+    pending_ids = Friendship.objects.filter(
+        Q(from_user=user) | Q(to_user=user)
+    ).exclude(status='accepted').values_list('from_user_id', 'to_user_id')
+    connected_ids = {
+        user.id, *friend_ids, *blocks.blocked_ids(user.id),
+        *(uid for pair in pending_ids for uid in pair)
+    }
+    
+    friend_suggestions = []
+    suggestions = FriendSuggestion.objects.filter(user=user).exclude(suggested_id__in=connected_ids)
+    for suggestion in suggestions.select_related('suggested').order_by('-mutual_count')[:10]:
+        suggestion.suggested.mutual_friends_count = suggestion.mutual_count
+        friend_suggestions.append(suggestion.suggested)
+    
+    if not friend_suggestions:
+        # Nothing built yet (new account)
+        friend_suggestions = list(User.objects.exclude(id__in=connected_ids)[:10])
+    
+    relationships.attach_mutual_friends(user, friend_suggestions)
+    return relationships.attach_relationships(user, friend_suggestions)
+
+
 # ==================== PROFILE ====================
 
 @login_required
 def profile_view(request, username):
     """User profile"""
     profile_user = get_object_or_404(User, username=username)
+    posts, posts_cursor = _profile_posts(request.user, profile_user)
     
-    # Check friendship status
-    is_friend = Friendship.objects.filter(
-        Q(from_user=request.user, to_user=profile_user, status='accepted') |
-        Q(from_user=profile_user, to_user=request.user, status='accepted')
-    ).exists()
+    context = {
+        'profile_user': profile_user,
+        **_profile_relationship(request.user, profile_user),
+        'posts': posts,
+        'posts_cursor': posts_cursor,
+        'photos': _profile_photos(request.user, profile_user),
+    }
     
-    friend_request_sent = Friendship.objects.filter(
-        from_user=request.user, to_user=profile_user, status='pending'
-    ).exists()
+    return render(request, 'profile.html', context)
+
+
+@login_required
+def profile_posts_view(request, username):
+    """Next page of a profile timeline (JSON with an HTML fragment)"""
+    profile_user = get_object_or_404(User, username=username)
+    try:
+        posts, next_cursor = _profile_posts(request.user, profile_user, request.GET.get('cursor') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
     
-    friend_request_received = Friendship.objects.filter(
-        from_user=profile_user, to_user=request.user, status='pending'
-    ).exists()
+    html = render_to_string('partials/profile_posts.html', {'posts': posts}, request=request)
     
-    # Get user's posts
-    posts = Post.objects.filter(
-        author=profile_user,
-        is_archived=False
-    ).select_related('author').prefetch_related(
-        'reactions', 'comments', 'media'
-    ).order_by('-created_at')[:20]
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+
+@login_required
+def profile_photos_view(request, username):
+    """Cursor-paginated photo grid for a profile, or for one of its albums"""
+    profile_user = get_object_or_404(User, username=username)
+    
+    album = None
+    album_id = request.GET.get('album')
+    if album_id:
+        if not album_id.isdigit():
+            return JsonResponse({'error': 'Invalid album'}, status=400)
+        album = get_object_or_404(Album, id=album_id, user=profile_user)
+        if not timeline.can_view_album(request.user, album):
+            return JsonResponse({'error': 'Album not found'}, status=404)
+    
+    try:
+        photos, next_cursor = timeline.photo_page(request.user, profile_user, request.GET.get('cursor') or None, album)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    return JsonResponse({
+        'photos': [
+            {'id': photo.id, 'url': photo.image.url if photo.image else None, 'caption': photo.caption}
+            for photo in photos
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+def _profile_relationship(viewer, profile_user):
+    """Friendship status between the viewer and a profile, plus the profile's header counts
+
+    Post and photo counts include only_me posts and private albums, so
+    they are shown to the owner alone.
+    """
+    summary = profiles.profile_summary(profile_user.id)
+    is_owner = viewer.id == profile_user.id
+    return {
+        **profiles.relationship(viewer.id, profile_user.id),
+        'friends_count': summary['friends_count'],
+        'posts_count': summary['posts_count'] if is_owner else None,
+        'photos_count': summary['photos_count'] if is_owner else None,
+    }
+
+
+def _profile_posts(viewer, profile_user, cursor=None):
+    """A page of a profile's timeline that the viewer may see, pinned posts first"""
+    posts, next_cursor = timeline.timeline_page(
+        viewer,
+        profile_user,
+        cursor,
+        Post.objects.select_related('author').prefetch_related(comments.comment_preview_prefetch(viewer), 'media')
+    )
+    return reactions.attach_reaction_summaries(posts), next_cursor
+
+
+def _profile_photos(viewer, profile_user):
+    """A profile's most recent photos that the viewer may see"""
+    if viewer.id == profile_user.id:
+        return profiles.recent_photos(profile_user.id)
+    # The cached recent ids span every album, so others get a privacy-filtered page
+    photos, _ = timeline.photo_page(viewer, profile_user, limit=profiles.RECENT_PHOTOS)
+    return photos
+
+
+# ==================== ASYNC (ASGI) ====================
+
+def _in_thread(func, *args, **kwargs):
+    """Run a blocking ORM call on its own worker thread and database connection
+    
+    thread_sensitive=False is what lets independent queries overlap; the
+    default would queue them all on the single sync thread.
+    """
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+@login_required
+async def newsfeed_async_view(request):
+    """Main newsfeed with posts, stories and suggestions queried concurrently"""
+    user = await request.auser()
+    friend_ids = await _in_thread(friend_graph.friend_ids, user.id)
+    
+    (cards, next_cursor, head_cursor), stories, friend_suggestions = await asyncio.gather(
+        _in_thread(_newsfeed_cards, user),
+        _in_thread(stories_tray, user, friend_ids),
+        _in_thread(_friend_suggestions, user, friend_ids),
+    )
     
-    # Get friends count
-    friends_count = Friendship.objects.filter(
-        Q(from_user=profile_user, status='accepted') |
-        Q(to_user=profile_user, status='accepted')
-    ).count()
+    context = {
+        'post_cards': cards,
+        'next_cursor': next_cursor,
+        'head_cursor': head_cursor,
+        'stories': stories,
+        'friend_suggestions': friend_suggestions,
+    }
     
-    # Get photos
-    photos = Photo.objects.filter(user=profile_user).order_by('-created_at')[:9]
+    return await sync_to_async(render)(request, 'newsfeed.html', context)
+
+
+@login_required
+async def profile_async_view(request, username):
+    """User profile with relationship, posts and photos queried concurrently"""
+    user = await request.auser()
+    profile_user = await _in_thread(get_object_or_404, User, username=username)
+    
+    relationship, (posts, posts_cursor), photos = await asyncio.gather(
+        _in_thread(_profile_relationship, user, profile_user),
+        _in_thread(_profile_posts, user, profile_user),
+        _in_thread(_profile_photos, user, profile_user),
+    )
     
     context = {
         'profile_user': profile_user,
-        'is_friend': is_friend,
-        'friend_request_sent': friend_request_sent,
-        'friend_request_received': friend_request_received,
+        **relationship,
         'posts': posts,
-        'friends_count': friends_count,
+        'posts_cursor': posts_cursor,
         'photos': photos,
     }
     
-    return render(request, 'profile.html', context)
+    return await sync_to_async(render)(request, 'profile.html', context)
 
 
 @login_required
@@ -229,21 +406,41 @@ def create_post_view(request):
     location = request.POST.get('location', '')
     privacy = request.POST.get('privacy', 'friends')
     
-    post = Post.objects.create(
-        author=request.user,
-        content=content,
-        feeling=feeling,
-        location=location,
-        privacy=privacy
-    )
-    
-    # Handle media uploads
-    if 'media' in request.FILES:
-        for media_file in request.FILES.getlist('media'):
-            PostMedia.objects.create(
-                post=post,
-                media_type='image',
-                file=media_file
+    # A post is never left behind without the audience it was meant for
+    with transaction.atomic():
+        post = Post.objects.create(
+            author=request.user,
+            content=content,
+            feeling=feeling,
+            location=location,
+            privacy=privacy
+        )
+        
+        # Audience lists for friends_except, specific_friends and custom posts
+        if privacy in ('friends_except', 'specific_friends', 'custom'):
+            set_audience(
+                post,
+                include_ids=[int(uid) for uid in request.POST.getlist('audience_include') if uid.isdigit()],
+                exclude_ids=[int(uid) for uid in request.POST.getlist('audience_exclude') if uid.isdigit()]
+            )
+        
+        # Handle media uploads
+        if 'media' in request.FILES:
+            media_files = request.FILES.getlist('media')
+            uploaded = []
+            for order, media_file in enumerate(media_files):
+                # A first guess from the browser; the media pipeline sniffs the real type
+                content_type = getattr(media_file, 'content_type', '') or ''
+                uploaded.append(PostMedia.objects.create(
+                    post=post,
+                    media_type='video' if content_type.startswith('video/') else 'image',
+                    file=media_file,
+                    order=order
+                ))
+            media.enqueue(media_item.id for media_item in uploaded)
+            Post.objects.filter(id=post.id).update(
+                media_count=F('media_count') + len(media_files),
+                version=F('version') + 1
             )
     
     messages.success(request, 'Post created successfully!')
@@ -253,23 +450,53 @@ def create_post_view(request):
 @login_required
 def post_detail_view(request, post_id):
     """Single post detail"""
-    post = get_object_or_404(
-        Post.objects.select_related('author').prefetch_related(
-            'reactions', 'comments__author', 'media'
-        ),
-        id=post_id
-    )
+    post = get_object_or_404(visible_posts(Post.objects.all(), request.user).select_related('author'), id=post_id)
+    thread, comments_cursor = comments.comment_thread(request.user, post.id)
     
-    context = {'post': post}
+    context = {
+        'post': post,
+        'post_cards': post_cards.render_cards(request.user, [post.id]),
+        'comments': thread,
+        'comments_cursor': comments_cursor,
+    }
     return render(request, 'post_detail.html', context)
 
 
+@login_required
+def post_comments_view(request, post_id):
+    """Next page of a post's top-level comments (JSON with an HTML fragment)"""
+    post = get_object_or_404(visible_posts(Post.objects.all(), request.user), id=post_id)
+    try:
+        thread, next_cursor = comments.comment_thread(request.user, post.id, request.GET.get('cursor') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    html = render_to_string('partials/comment_thread.html', {'comments': thread}, request=request)
+    
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+
+@login_required
+def comment_replies_view(request, comment_id):
+    """Next page of replies to a comment ("View more replies")"""
+    comment = get_object_or_404(Comment, id=comment_id)
+    get_object_or_404(visible_posts(Post.objects.all(), request.user), id=comment.post_id)
+    try:
+        replies, next_cursor = comments.reply_page(request.user, comment.id, request.GET.get('cursor') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    html = render_to_string('partials/comment_replies.html', {'replies': replies}, request=request)
+    
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+
 @login_required
 @require_POST
 def delete_post_view(request, post_id):
     """Delete a post"""
-    post = get_object_or_404(Post, id=post_id, author=request.user)
-    post.delete()
+    post = get_object_or_404(Post, id=post_id, author=request.user, deleted_at__isnull=True)
+    deletion.soft_delete_post(post)
     messages.success(request, 'Post deleted successfully!')
     return redirect('newsfeed')
 
@@ -278,23 +505,16 @@ def delete_post_view(request, post_id):
 @require_POST
 def react_to_post_view(request, post_id):
     """Add reaction to post"""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post, id=post_id, deleted_at__isnull=True)
     reaction_type = request.POST.get('reaction_type', 'like')
     
-    reaction, created = Reaction.objects.get_or_create(
-        user=request.user,
-        post=post,
-        defaults={'reaction_type': reaction_type}
-    )
-    
-    if not created:
-        if reaction.reaction_type == reaction_type:
-            reaction.delete()
-            return JsonResponse({'status': 'removed'})
-        else:
-            reaction.reaction_type = reaction_type
-            reaction.save()
+    try:
+        status, _ = reaction_buffer.react(request.user, post.id, reaction_type)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
+    if status == 'removed':
+        return JsonResponse({'status': 'removed'})
     return JsonResponse({'status': 'success', 'reaction': reaction_type})
 
 
@@ -302,44 +522,161 @@ def react_to_post_view(request, post_id):
 @require_POST
 def comment_on_post_view(request, post_id):
     """Add comment to post"""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post, id=post_id, deleted_at__isnull=True)
     content = request.POST.get('content', '')
     
+    parent_id = None
+    reply_to = request.POST.get('parent_comment_id', '')
+    if reply_to:
+        parent_id = comments.reply_parent_id(post.id, reply_to) if reply_to.isdigit() else None
+        if parent_id is None:
+            raise Http404('Comment not found')
+    
     if content:
-        Comment.objects.create(
-            post=post,
-            author=request.user,
-            content=content
-        )
-        
-        # Create notification for post author
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                sender=request.user,
-                notification_type='post_comment',
-                title='New comment on your post',
-                message=f'{request.user.get_full_name()} commented on your post'
+        with transaction.atomic():
+            Comment.objects.create(
+                post=post,
+                author=request.user,
+                content=content,
+                parent_comment_id=parent_id
+            )
+            Post.objects.filter(id=post.id).update(
+                comment_count=F('comment_count') + 1,
+                version=F('version') + 1
             )
+        
+        # Notify the post author, folded into their open row for this post
+        notifications.notify(
+            post.author,
+            request.user,
+            'post_comment',
+            'commented on your post',
+            title='New comment on your post',
+            target_key=f'post:{post.id}',
+            link=request.build_absolute_uri(reverse('post_detail', args=[post.id]))
+        )
     
     return redirect('post_detail', post_id=post_id)
 
 
+# ==================== UPLOADS ====================
+
+def _upload_state(session):
+    return {
+        'id': str(session.id),
+        'status': session.status,
+        'offset': session.received,
+        'size': session.total_size,
+        'chunk_size': uploads.CHUNK_SIZE,
+    }
+
+
+@login_required
+@require_POST
+def upload_start_view(request):
+    """Open a chunked upload session"""
+    size = request.POST.get('size', '')
+    if not size.isdigit():
+        return JsonResponse({'error': 'Invalid upload size'}, status=400)
+    try:
+        session = uploads.start_session(
+            request.user,
+            request.POST.get('target', ''),
+            request.POST.get('filename', ''),
+            int(size),
+            request.POST.get('content_type', ''),
+            request.POST.get('checksum', '')
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(_upload_state(session), status=201)
+
+
+@login_required
+def upload_status_view(request, session_id):
+    """Where to resume an interrupted upload"""
+    session = get_object_or_404(UploadSession, id=session_id, user=request.user)
+    return JsonResponse(_upload_state(session))
+
+
+@login_required
+@require_POST
+def upload_chunk_view(request, session_id):
+    """Append one raw chunk; Upload-Offset and Upload-Checksum (SHA-256 hex) headers are required"""
+    session = get_object_or_404(UploadSession, id=session_id, user=request.user)
+    if request.content_type != 'application/octet-stream':
+        # Form-encoded bodies would be parsed (and buffered) before we could stream them
+        return JsonResponse({'error': 'Chunks must be sent as application/octet-stream'}, status=415)
+    offset = request.headers.get('Upload-Offset', '')
+    if not offset.isdigit():
+        return JsonResponse({'error': 'Invalid Upload-Offset header'}, status=400)
+    length = request.META.get('CONTENT_LENGTH') or ''
+    if not length.isdigit():
+        return JsonResponse({'error': 'Invalid Content-Length header'}, status=400)
+    try:
+        received = uploads.write_chunk(
+            session, int(offset), request, int(length), request.headers.get('Upload-Checksum', '')
+        )
+    except uploads.OffsetMismatch as e:
+        return JsonResponse({'error': str(e), 'offset': e.expected}, status=409)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'offset': received, 'size': session.total_size})
+
+
+@login_required
+@require_POST
+def upload_complete_view(request, session_id):
+    """Assemble a finished upload into post media or a Watch video"""
+    session = get_object_or_404(UploadSession, id=session_id, user=request.user)
+    post = None
+    if session.target == 'post_media':
+        post_id = request.POST.get('post_id', '')
+        if not post_id.isdigit():
+            return JsonResponse({'error': 'Invalid post id'}, status=400)
+        post = get_object_or_404(Post, id=post_id, author=request.user, deleted_at__isnull=True)
+    
+    try:
+        target = uploads.complete_session(
+            session,
+            post=post,
+            title=request.POST.get('title', ''),
+            description=request.POST.get('description', ''),
+            privacy=request.POST.get('privacy', 'public')
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'status': 'complete', 'target': session.target, 'id': target.id})
+
+
+@login_required
+@require_POST
+def upload_abort_view(request, session_id):
+    """Cancel an upload and discard what was received"""
+    session = get_object_or_404(UploadSession, id=session_id, user=request.user)
+    uploads.abort_session(session)
+    return JsonResponse({'status': 'aborted'})
+
+
 # ==================== FRIENDS ====================
 
 @login_required
 def friends_view(request):
     """List of friends"""
-    friends = User.objects.filter(
-        Q(friendships_received__from_user=request.user, friendships_received__status='accepted') |
-        Q(friendships_sent__to_user=request.user, friendships_sent__status='accepted')
-    ).distinct()
+    friends = relationships.attach_relationships(
+        request.user,
+        User.objects.filter(id__in=friend_graph.friend_ids(request.user.id))
+    )
     
     # Friend requests
-    friend_requests = Friendship.objects.filter(
+    friend_requests = list(Friendship.objects.filter(
         to_user=request.user,
         status='pending'
-    ).select_related('from_user')
+    ).select_related('from_user'))
+    relationships.attach_mutual_friends(request.user, [friendship.from_user for friendship in friend_requests])
     
     context = {
         'friends': friends,
@@ -366,13 +703,15 @@ def send_friend_request_view(request, user_id):
     )
     
     if created:
-        # Create notification
-        Notification.objects.create(
-            recipient=to_user,
-            sender=request.user,
-            notification_type='friend_request',
+        notifications.notify(
+            to_user,
+            request.user,
+            'friend_request',
+            'sent you a friend request',
             title='New friend request',
-            message=f'{request.user.get_full_name()} sent you a friend request'
+            # One row per requester; the friends page lists each request with its accept button
+            target_key=f'user:{request.user.id}',
+            link=request.build_absolute_uri(reverse('friends'))
         )
         messages.success(request, 'Friend request sent!')
     else:
@@ -395,13 +734,14 @@ def accept_friend_request_view(request, friendship_id):
     friendship.status = 'accepted'
     friendship.save()
     
-    # Create notification
-    Notification.objects.create(
-        recipient=friendship.from_user,
-        sender=request.user,
-        notification_type='friend_accepted',
+    notifications.notify(
+        friendship.from_user,
+        request.user,
+        'friend_accepted',
+        'accepted your friend request',
         title='Friend request accepted',
-        message=f'{request.user.get_full_name()} accepted your friend request'
+        target_key=f'user:{request.user.id}',
+        link=request.build_absolute_uri(reverse('profile', args=[request.user.username]))
     )
     
     messages.success(request, 'Friend request accepted!')
@@ -428,9 +768,12 @@ def unfriend_view(request, user_id):
 @login_required
 def messenger_view(request):
     """Messenger inbox"""
-    conversations = Conversation.objects.filter(
-        participants=request.user
-    ).prefetch_related('participants', 'messages').order_by('-updated_at')
+    conversations = Conversation.objects.filter(participants=request.user)
+    blocked = blocks.blocked_ids(request.user.id)
+    if blocked:
+        # Hide one-to-one threads with anyone blocked either way
+        conversations = conversations.exclude(conversation_type='direct', participants__in=blocked)
+    conversations = conversations.prefetch_related('participants', 'messages').order_by('-updated_at')
     
     context = {'conversations': conversations}
     return render(request, 'messenger.html', context)
@@ -523,7 +866,8 @@ def group_detail_view(request, group_id):
         group=group
     ).select_related('author').order_by('-is_pinned', '-created_at')[:20]
     
-    members = group.members.filter(status='approved').select_related('user')[:12]
+    members = list(group.members.filter(status='approved').select_related('user')[:12])
+    relationships.attach_relationships(request.user, [member.user for member in members])
     member_count = group.members.filter(status='approved').count()
     
     context = {
@@ -560,14 +904,10 @@ def join_group_view(request, group_id):
 @login_required
 def notifications_view(request):
     """List notifications"""
-    notifications = Notification.objects.filter(
-        recipient=request.user
-    ).select_related('sender').order_by('-created_at')[:50]
-    
-    # Mark as read
-    notifications.filter(is_read=False).update(is_read=True)
+    recent = notifications.recent_notifications(request.user)
+    notifications.mark_read(recent)
     
-    context = {'notifications': notifications}
+    context = {'notifications': recent}
     return render(request, 'notifications.html', context)
 
 
@@ -580,16 +920,20 @@ def search_view(request):
     
     if query:
         # Search users
-        users = User.objects.filter(
+        users = blocks.exclude_blocked(User.objects.filter(
             Q(first_name__icontains=query) |
             Q(last_name__icontains=query) |
             Q(username__icontains=query)
-        )[:20]
+        ), request.user)[:20]
+        users = relationships.attach_relationships(request.user, users)
+        relationships.attach_mutual_friends(request.user, users)
         
         # Search posts
-        posts = Post.objects.filter(
-            content__icontains=query
-        ).select_related('author')[:20]
+        posts = visible_posts(Post.objects.filter(
+            content__icontains=query,
+            is_archived=False
+        ), request.user)
+        posts = blocks.exclude_blocked(posts, request.user, 'author_id').select_related('author')[:20]
         
         # Search groups
         groups = Group.objects.filter(